@@ -1,11 +1,22 @@
 import os
 from flask import Flask, request, session
 from .models import db, AdminUser
+from .database import init_database
+from .jsonprovider import init_json
+from .slowlog import init_slow_query_log
 from .admin import create_admin
 from .routes.auth import auth_bp
 from .routes.lang import lang_bp
 from flask_babel import Babel
 from .routes.api import api_bp
+from .search import init_search
+from .cache import init_cache
+from .images import init_images
+from .uploads import init_uploads
+from .writebehind import init_write_behind
+from .bulk import init_bulk
+from .queryplan import init_queryplan
+from .metrics import init_metrics
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from app.config import DevelopmentConfig, ProductionConfig
@@ -27,9 +38,12 @@ def create_app(config_class=None):
             config_class = DevelopmentConfig
 
     app.config.from_object(config_class)
+    init_json(app)
 
     # Инициализация расширений
     db.init_app(app)
+    init_database(app)
+    init_slow_query_log(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
 
@@ -45,6 +59,14 @@ def create_app(config_class=None):
 
     with app.app_context():
         db.create_all()  # ⚠️ в продакшене лучше убрать и использовать flask db upgrade
+    init_search(app)
+    init_cache(app)
+    init_images(app)
+    init_uploads(app)
+    init_write_behind(app)
+    init_bulk(app)
+    init_queryplan(app)
+    init_metrics(app)
 
     babel.init_app(app, locale_selector=get_locale)
     return app
@@ -1,15 +1,24 @@
-import os
+import io
+
 from flask_admin import Admin, AdminIndexView, expose
+from flask_admin.actions import action
 from flask_admin.contrib.sqla import ModelView
-from flask_admin.form import ImageUploadField
-from flask import redirect, url_for
+from flask_admin.helpers import get_redirect_target
+from flask import Response, current_app, flash, g, has_app_context, redirect, request, stream_with_context, url_for
 from wtforms import FileField, TextAreaField
 from flask_babel import gettext as _, lazy_gettext as _l, get_locale
+from sqlalchemy import event, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import joinedload, selectinload
 
+from .cache import cached_value
+from .bulk import EXPORT_FORMATS, EXPORT_MIMETYPES, export_filename, import_subscribers, iter_export
+from .images import schedule_variants, model_image_paths
+from .uploads import HashedImageUploadField, save_upload
 from .models import (
     db, Product, ProductCategory, Brand, News, Banner,
     ContactMessage, NewsletterSubscriber, AdminUser,
-    Company, Certificate
+    Company, Certificate, localized_value
 )
 
 # -----------------------------
@@ -27,22 +36,58 @@ class SecureModelView(ModelView):
     def inaccessible_callback(self, name, **kwargs):
         return redirect(url_for("auth.login"))
 
+    # Связи, которые читают column_formatters: загружаются вместе со страницей списка,
+    # а не отдельным запросом на каждую строку. Элемент — имя связи (для *-to-one
+    # используется JOIN, для коллекций — selectin) или пара (имя, "joined"|"selectin").
+    column_eager_loads = ()
+
+    def after_model_change(self, form, model, is_created):
+        # Уменьшенные копии изображений создаются в фоне, сохранение не ждет их
+        schedule_variants(model_image_paths(model), model.__tablename__)
+
+    def get_query(self):
+        query = super().get_query()
+        options = [_eager_load_option(self.model, item) for item in self.column_eager_loads]
+        return query.options(*options) if options else query
+
+    @expose("/")
+    def index_view(self):
+        if not current_app.debug:
+            return super().index_view()
+        g.admin_query_count = 0
+        g.admin_row_queries = 0
+        try:
+            response = super().index_view()
+            count = g.admin_row_queries
+        finally:
+            g.pop("admin_query_count", None)
+            g.pop("admin_row_queries", None)
+        # Строки страницы уже загружены get_list(), поэтому любой запрос при выводе
+        # ячеек — ленивая загрузка связи в каждой строке (N+1), сколько бы строк ни было:
+        # добавьте связь в column_eager_loads
+        assert count == 0, (
+            f"{type(self).__name__} list page issued {count} queries while rendering rows, "
+            f"eager-load the relationships its columns read"
+        )
+        return response
+
+    def _get_list_value(self, context, model, name, *args):
+        # Значение ячейки списка: формат-функция или атрибут строки
+        if "admin_row_queries" not in g:
+            return super()._get_list_value(context, model, name, *args)
+        before = g.admin_query_count
+        try:
+            return super()._get_list_value(context, model, name, *args)
+        finally:
+            g.admin_row_queries += g.admin_query_count - before
+
 # -----------------------------
 # Admin Dashboard
 # -----------------------------
 class MyAdminIndexView(AdminIndexView):
     @expose("/")
     def index(self):
-        stats = {
-            "companies": Company.query.count(),
-            "products": Product.query.count(),
-            "categories": ProductCategory.query.count(),
-            "brands": Brand.query.count(),
-            "news": News.query.count(),
-            "certificates": Certificate.query.count(),
-            "subscribers": NewsletterSubscriber.query.count(),
-            "users": AdminUser.query.count(),
-        }
+        stats = _dashboard_counts()
         from flask_babel import get_locale
         return self.render("admin/dashboard.html", stats=stats, locale=get_locale())
 
@@ -54,14 +99,10 @@ class MyAdminIndexView(AdminIndexView):
 class MultiImageUploadField(FileField):
     def process_formdata(self, valuelist):
         self.data = []
-        upload_folder = os.path.join("app", "static", "uploads", "products")
-        os.makedirs(upload_folder, exist_ok=True)
-
         for f in valuelist:
             if f.filename:
-                file_path = os.path.join(upload_folder, f.filename)
-                f.save(file_path)
-                self.data.append(os.path.join("static", "uploads", "products", f.filename))
+                # Имя файла — хэш содержимого (см. app/uploads.py)
+                self.data.append(save_upload(f, "products"))
 
     def _value(self):
         return self.data if self.data else []
@@ -91,6 +132,7 @@ class ProductAdmin(SecureModelView):
         "brand_i18n": lambda v, c, m, p: (_get_i18n_attr(m.brand, "name") if getattr(m, "brand", None) else ""),
         "category_i18n": lambda v, c, m, p: (_get_i18n_attr(m.category, "name") if getattr(m, "category", None) else ""),
     }
+    column_eager_loads = ("brand", "category")
     form_columns = [
         "name_en", "name_ru", "name_tk",
         "slug",
@@ -110,21 +152,13 @@ class ProductAdmin(SecureModelView):
     edit_template = "admin/model/edit.html"
     create_template = "admin/model/create.html"
     form_extra_fields = {
-        "image": ImageUploadField(
-            "Main Image",
-            base_path=os.path.join("app", "static", "uploads", "products"),
-            relative_path="",
-            url_relative_path="static/uploads/products/"
-        ),
+        "image": HashedImageUploadField("Main Image", folder="products"),
         "additional_images": MultiImageUploadField("Additional Images")
     }
 
     def on_model_change(self, form, model, is_created):
         if form.additional_images.data:
             model.additional_images = form.additional_images.data
-        if form.image.data and hasattr(form.image.data, 'filename'):
-            # Сохраняем полный путь к изображению
-            model.image = f"static/uploads/products/{form.image.data.filename}"
 
 # -----------------------------
 # Brand Admin
@@ -139,6 +173,7 @@ class BrandAdmin(SecureModelView):
         "name_i18n": lambda v, c, m, p: _get_i18n_attr(m, "name"),
         "company_i18n": lambda v, c, m, p: (_get_i18n_attr(m.company, "name") if getattr(m, "company", None) else ""),
     }
+    column_eager_loads = ("company",)
     form_columns = [
         "name_en", "name_ru", "name_tk",
         "subtitle_en", "subtitle_ru", "subtitle_tk",
@@ -155,18 +190,9 @@ class BrandAdmin(SecureModelView):
     edit_template = "admin/model/edit.html"
     create_template = "admin/model/create.html"
     form_extra_fields = {
-        "logo_image": ImageUploadField(
-            "Logo",
-            base_path=os.path.join("app", "static", "uploads", "brands"),
-            relative_path="",
-            url_relative_path="static/uploads/brands/"
-        )
+        "logo_image": HashedImageUploadField("Logo", folder="brands")
     }
 
-    def on_model_change(self, form, model, is_created):
-        if form.logo_image.data and hasattr(form.logo_image.data, 'filename'):
-            # Сохраняем полный путь к изображению
-            model.logo_image = f"static/uploads/brands/{form.logo_image.data.filename}"
 
 # -----------------------------
 # News Admin
@@ -181,6 +207,7 @@ class NewsAdmin(SecureModelView):
         "title_i18n": lambda v, c, m, p: _get_i18n_attr(m, "title"),
         "company_i18n": lambda v, c, m, p: (_get_i18n_attr(m.company, "name") if getattr(m, "company", None) else ""),
     }
+    column_eager_loads = ("company",)
     form_columns = [
         "title_en", "title_ru", "title_tk",
         "subtitle_en", "subtitle_ru", "subtitle_tk",
@@ -196,18 +223,9 @@ class NewsAdmin(SecureModelView):
     edit_template = EDIT_TEMPLATE
     create_template = CREATE_TEMPLATE
     form_extra_fields = {
-        "image": ImageUploadField(
-            "News Image",
-            base_path=os.path.join("app", "static", "uploads", "news"),
-            relative_path="",
-            url_relative_path="static/uploads/news/"
-        )
+        "image": HashedImageUploadField("News Image", folder="news")
     }
 
-    def on_model_change(self, form, model, is_created):
-        if form.image.data and hasattr(form.image.data, 'filename'):
-            # Сохраняем полный путь к изображению
-            model.image = f"static/uploads/news/{form.image.data.filename}"
 
 # -----------------------------
 # Certificate Admin
@@ -222,18 +240,9 @@ class CertificateAdmin(SecureModelView):
     edit_template = "admin/model/edit.html"
     create_template = "admin/model/create.html"
     form_extra_fields = {
-        "image": ImageUploadField(
-            "Certificate Image",
-            base_path=os.path.join("app", "static", "uploads", "certificates"),
-            relative_path="",
-            url_relative_path="static/uploads/certificates/"
-        )
+        "image": HashedImageUploadField("Certificate Image", folder="certificates")
     }
 
-    def on_model_change(self, form, model, is_created):
-        if form.image.data and hasattr(form.image.data, 'filename'):
-            model.image = f"static/uploads/certificates/{form.image.data.filename}"
-
 
 # -----------------------------
 # Banner Admin
@@ -249,17 +258,9 @@ class BannerAdmin(SecureModelView):
     edit_template = "admin/model/edit.html"
     create_template = "admin/model/create.html"
     form_extra_fields = {
-        "image": ImageUploadField(
-            "Banner Image",
-            base_path=os.path.join("app", "static", "uploads", "banners"),
-            relative_path="",
-            url_relative_path="static/uploads/banners/"
-        )
+        "image": HashedImageUploadField("Banner Image", folder="banners")
     }
 
-    def on_model_change(self, form, model, is_created):
-        if form.image.data and hasattr(form.image.data, 'filename'):
-            model.image = f"static/uploads/banners/{form.image.data.filename}"
 # -----------------------------
 # Company Admin
 # -----------------------------
@@ -306,6 +307,7 @@ class ProductCategoryAdmin(SecureModelView):
         "name_i18n": lambda v, c, m, p: _get_i18n_attr(m, "name"),
         "parent_i18n": lambda v, c, m, p: (_get_i18n_attr(m.parent, "name") if getattr(m, "parent", None) else ""),
     }
+    column_eager_loads = ("parent",)
     form_columns = [
         "name_en", "name_ru", "name_tk",
         "slug",
@@ -320,23 +322,73 @@ class ProductCategoryAdmin(SecureModelView):
     edit_template = "admin/model/edit.html"
     create_template = "admin/model/create.html"
     form_extra_fields = {
-        "image": ImageUploadField(
-            "Category Image",
-            base_path=os.path.join("app", "static", "uploads", "categories"),
-            relative_path="",
-            url_relative_path="static/uploads/categories/"
-        )
+        "image": HashedImageUploadField("Category Image", folder="categories")
     }
 
-    def on_model_change(self, form, model, is_created):
-        if form.image.data and hasattr(form.image.data, 'filename'):
-            # Сохраняем полный путь к изображению
-            model.image = f"static/uploads/categories/{form.image.data.filename}"
+
+# -----------------------------
+# Streaming export (CSV / NDJSON)
+# -----------------------------
+class BulkExportMixin:
+    """Кнопка «Export» и действия над выбранными строками выгружают данные потоком.
+
+    В отличие от встроенного экспорта Flask-Admin строки не собираются в
+    памяти, поэтому ограничение export_max_rows не нужно.
+    """
+    can_export = True
+    export_types = list(EXPORT_FORMATS)
+
+    @expose("/export/<export_type>/")
+    def export(self, export_type):
+        if not self.can_export or export_type not in self.export_types:
+            flash(_("Permission denied."), "error")
+            return redirect(get_redirect_target() or self.get_url(".index_view"))
+        return self._stream_export(export_type)
+
+    @action("export_csv", _l("Export CSV"))
+    def action_export_csv(self, ids):
+        return self._stream_export("csv", ids)
+
+    @action("export_ndjson", _l("Export NDJSON"))
+    def action_export_ndjson(self, ids):
+        return self._stream_export("ndjson", ids)
+
+    def _stream_export(self, fmt, ids=None):
+        filename = export_filename(self.model, fmt)
+        return Response(
+            stream_with_context(iter_export(self.model, fmt, ids=ids)),
+            mimetype=EXPORT_MIMETYPES[fmt],
+            headers={"Content-Disposition": f"attachment; filename={filename}"},
+        )
+
+# -----------------------------
+# NewsletterSubscriber Admin
+# -----------------------------
+class NewsletterSubscriberAdmin(BulkExportMixin, SecureModelView):
+    list_template = "admin/subscriber_list.html"
+
+    @expose("/import/", methods=("GET", "POST"))
+    def import_view(self):
+        return_url = self.get_url(".index_view")
+        if request.method == "POST":
+            upload = request.files.get("file")
+            if not upload or not upload.filename:
+                flash(_("Choose a CSV file"), "error")
+                return redirect(self.get_url(".import_view"))
+            # Файл читается построчно, целиком в память не загружается
+            lines = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+            stats = import_subscribers(lines)
+            flash(_(
+                "Imported %(inserted)s, already subscribed %(skipped)s, invalid %(invalid)s",
+                **stats,
+            ), "success")
+            return redirect(return_url)
+        return self.render("admin/import.html", return_url=return_url)
 
 # -----------------------------
 # ContactMessage Admin
 # -----------------------------
-class ContactMessageAdmin(SecureModelView):
+class ContactMessageAdmin(BulkExportMixin, SecureModelView):
     column_list = ("name", "email", "submission_date")
     form_columns = [
         "name", "email", "message", "submission_date"
@@ -366,7 +418,7 @@ def create_admin(app):
     admin.add_view(CertificateAdmin(Certificate, db.session, name=_l("Certificates"), menu_icon_type="fa", menu_icon_value="fa fa-certificate"))
     admin.add_view(BannerAdmin(Banner, db.session, name=_l("Banners"), menu_icon_type="fa", menu_icon_value="fa fa-image"))
     admin.add_view(ContactMessageAdmin(ContactMessage, db.session, name=_l("Messages"), menu_icon_type="fa", menu_icon_value="fa fa-envelope"))
-    admin.add_view(SecureModelView(NewsletterSubscriber, db.session, name=_l("Subscribers"), menu_icon_type="fa", menu_icon_value="fa fa-users"))
+    admin.add_view(NewsletterSubscriberAdmin(NewsletterSubscriber, db.session, name=_l("Subscribers"), menu_icon_type="fa", menu_icon_value="fa fa-users"))
     admin.add_view(SecureModelView(AdminUser, db.session, name=_l("Users"), menu_icon_type="fa", menu_icon_value="fa fa-user-shield"))
 
     return admin
@@ -375,6 +427,45 @@ def create_admin(app):
 # -----------------------------
 # Helpers
 # -----------------------------
+DASHBOARD_MODELS = {
+    "companies": Company,
+    "products": Product,
+    "categories": ProductCategory,
+    "brands": Brand,
+    "news": News,
+    "certificates": Certificate,
+    "subscribers": NewsletterSubscriber,
+    "users": AdminUser,
+}
+
+
+def _eager_load_option(model, item):
+    name, strategy = (item, None) if isinstance(item, str) else item
+    relationship = getattr(model, name)
+    if strategy is None:
+        strategy = "selectin" if relationship.property.uselist else "joined"
+    return selectinload(relationship) if strategy == "selectin" else joinedload(relationship)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_admin_queries(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and "admin_query_count" in g:
+        g.admin_query_count += 1
+
+
+def _dashboard_counts():
+    """Количество записей для дашборда: один SELECT из подзапросов COUNT(*),
+    закэшированный до изменения любой из таблиц."""
+    def compute():
+        columns = [
+            db.select(func.count()).select_from(model).scalar_subquery().label(name)
+            for name, model in DASHBOARD_MODELS.items()
+        ]
+        return dict(db.session.execute(db.select(*columns)).one()._mapping)
+
+    return cached_value("dashboard_counts", DASHBOARD_MODELS.values(), compute)
+
+
 def _current_lang_code():
     loc = str(get_locale() or "en")
     if loc.startswith("ru"):
@@ -387,14 +478,5 @@ def _current_lang_code():
 def _get_i18n_attr(model_obj, base_name):
     if model_obj is None:
         return ""
-    lang = _current_lang_code()
-    preferred_attr = f"{base_name}_{lang}"
-    value = getattr(model_obj, preferred_attr, None)
-    if value:
-        return value
     # fallback порядок: en -> ru -> tk
-    for fallback in ("en", "ru", "tk"):
-        val = getattr(model_obj, f"{base_name}_{fallback}", None)
-        if val:
-            return val
-    return ""
\ No newline at end of file
+    return localized_value(model_obj, base_name, _current_lang_code()) or ""
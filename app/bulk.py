@@ -0,0 +1,149 @@
+"""Потоковый экспорт и массовый импорт подписчиков и сообщений.
+
+Экспорт читает строки курсором порциями (``yield_per``) и сразу отдает их
+клиенту, поэтому память не зависит от размера таблицы. Импорт подписчиков
+читает CSV построчно и вставляет email пачками через
+``INSERT ... ON CONFLICT DO NOTHING``: уже существующие адреса пропускаются.
+"""
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime
+
+import click
+from flask.cli import with_appcontext
+
+from .models import db, ContactMessage, NewsletterSubscriber
+from .writebehind import upsert_subscribers
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_MIMETYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+EXPORT_MODELS = {
+    "subscribers": NewsletterSubscriber,
+    "messages": ContactMessage,
+}
+CHUNK_SIZE = 1000
+
+
+# -----------------------------
+# Экспорт
+# -----------------------------
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_export(model, fmt, ids=None, chunk_size=CHUNK_SIZE):
+    """Генератор строк файла экспорта; ``ids`` ограничивает выборку."""
+    columns = [c.name for c in model.__table__.columns]
+    stmt = db.select(*model.__table__.columns).order_by(model.__table__.c.id)
+    if ids is not None:
+        stmt = stmt.where(model.__table__.c.id.in_(ids))
+    rows = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(columns)
+    for partition in rows.partitions():
+        for row in partition:
+            if fmt == "csv":
+                writer.writerow([_plain(v) for v in row])
+            else:
+                buffer.write(json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False))
+                buffer.write("\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_filename(model, fmt):
+    return f"{model.__tablename__}_{datetime.utcnow():%Y%m%d_%H%M%S}.{fmt}"
+
+
+# -----------------------------
+# Импорт
+# -----------------------------
+def _read_emails(lines):
+    """Email из CSV: колонка ``email`` или, если заголовка нет, первая колонка."""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    normalized = [h.strip().lower() for h in header]
+    if "email" in normalized:
+        index = normalized.index("email")
+    else:
+        index = 0
+        yield header[0] if header else ""
+    for row in reader:
+        if len(row) > index:
+            yield row[index]
+
+
+def import_subscribers(lines, chunk_size=CHUNK_SIZE):
+    """Импортирует подписчиков из CSV; возвращает счетчики read/inserted/invalid."""
+    stats = {"read": 0, "inserted": 0, "invalid": 0}
+    chunk = []
+    now = datetime.utcnow()
+
+    def flush():
+        stats["inserted"] += upsert_subscribers(chunk)
+        db.session.commit()
+        chunk.clear()
+
+    for raw in _read_emails(lines):
+        stats["read"] += 1
+        email = raw.strip().lower()
+        if "@" not in email or len(email) > NewsletterSubscriber.email.type.length:
+            stats["invalid"] += 1
+            continue
+        chunk.append({"email": email, "subscription_date": now})
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    stats["skipped"] = stats["read"] - stats["invalid"] - stats["inserted"]
+    return stats
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+@click.command("bulk-export")
+@click.argument("table", type=click.Choice(sorted(EXPORT_MODELS)))
+@click.option("--format", "fmt", type=click.Choice(EXPORT_FORMATS), default="csv")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), help="Файл (по умолчанию stdout).")
+@with_appcontext
+def bulk_export_command(table, fmt, output):
+    """Выгрузить подписчиков или сообщения в CSV/NDJSON."""
+    model = EXPORT_MODELS[table]
+    out = open(output, "w", encoding="utf-8", newline="") if output else sys.stdout
+    try:
+        for chunk in iter_export(model, fmt):
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
+
+
+@click.command("bulk-import-subscribers")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@with_appcontext
+def bulk_import_subscribers_command(path):
+    """Импортировать подписчиков из CSV (колонка email)."""
+    with open(path, encoding="utf-8-sig", newline="") as fh:
+        stats = import_subscribers(fh)
+    click.echo(
+        f"Read {stats['read']}, inserted {stats['inserted']}, "
+        f"already subscribed {stats['skipped']}, invalid {stats['invalid']}"
+    )
+
+
+def init_bulk(app):
+    app.cli.add_command(bulk_export_command)
+    app.cli.add_command(bulk_import_subscribers_command)
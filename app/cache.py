@@ -0,0 +1,345 @@
+"""Кэш ответов публичного API и условные GET-запросы.
+
+Каждой таблице соответствует счетчик версии (таблица ``table_version``),
+который увеличивается в той же транзакции, что изменила таблицу. Ключ кэша и
+ETag включают версии таблиц, от которых зависит эндпоинт, поэтому после
+сохранения в админке старые записи просто перестают находиться и со временем
+вытесняются (LRU + TTL). Счетчики хранятся в базе, поэтому все воркеры
+gunicorn видят одни и те же версии (с задержкой не больше интервала опроса),
+а при чтении с реплики — версии, согласованные с её данными.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, make_response, request
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+
+from .compression import available_encodings, encode_response, negotiate_encoding
+from .models import db, TableVersion
+
+# Статусы, ответы с которыми можно кэшировать
+CACHEABLE_STATUSES = (200, 404)
+
+
+# -----------------------------
+# Версии таблиц
+# -----------------------------
+class TableVersions:
+    """Локальная копия счетчиков из table_version, перечитывается не чаще refresh_interval.
+
+    Счетчики читаются через тот же движок, что и данные запроса: GET-запросы API
+    идут в движок только для чтения (см. app/database.py). Реплика, отстающая от
+    основной базы, отдает и старые данные, и старые версии, поэтому ответ никогда
+    не попадает в кэш под версией, которую реплика еще не видела.
+    """
+
+    def __init__(self, refresh_interval=1.0):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._snapshots = {}  # движок -> (версии, момент чтения)
+
+    def get(self, tables):
+        versions = self._versions()
+        return tuple(versions.get(name, (0, None))[0] for name in tables)
+
+    def last_modified(self, tables):
+        versions = self._versions()
+        stamps = [versions.get(name, (0, None))[1] for name in tables]
+        stamps = [s for s in stamps if s is not None]
+        return max(stamps) if stamps else None
+
+    def invalidate(self):
+        self._snapshots = {}
+
+    def _versions(self):
+        engine = db.session.get_bind(mapper=TableVersion)
+        versions, loaded_at = self._snapshots.get(engine, ({}, 0.0))
+        if time.monotonic() - loaded_at < self.refresh_interval:
+            return versions
+        # Если другой поток уже перечитывает версии — работаем со старыми
+        if not self._lock.acquire(blocking=False):
+            return versions
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(select(
+                    TableVersion.table_name, TableVersion.version, TableVersion.updated_at
+                ))
+                versions = {name: (version, updated_at) for name, version, updated_at in rows}
+            self._snapshots = {**self._snapshots, engine: (versions, time.monotonic())}
+        finally:
+            self._lock.release()
+        return versions
+
+
+table_versions = TableVersions()
+
+
+def _table_name(model):
+    return model if isinstance(model, str) else model.__tablename__
+
+
+def bump_table_versions(connection, tables):
+    """Увеличивает счетчики указанных таблиц в текущей транзакции."""
+    now = datetime.utcnow()
+    version_table = TableVersion.__table__
+    for name in sorted(tables):
+        result = connection.execute(
+            update(version_table)
+            .where(version_table.c.table_name == name)
+            .values(version=version_table.c.version + 1, updated_at=now)
+        )
+        if not result.rowcount:
+            connection.execute(insert(version_table).values(table_name=name, version=1, updated_at=now))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_tables(session, flush_context):
+    changed = session.info.setdefault("changed_tables", set())
+    for obj in session.new | session.deleted:
+        changed.add(obj.__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            changed.add(obj.__table__.name)
+    changed.discard(TableVersion.__tablename__)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_changes(orm_execute_state):
+    # insert()/update()/delete(), выполненные через сессию, минуя unit of work
+    state = orm_execute_state
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        if table is not None and table.name != TableVersion.__tablename__:
+            state.session.info.setdefault("changed_tables", set()).add(table.name)
+
+
+@event.listens_for(Session, "before_commit")
+def _persist_changed_tables(session):
+    session.flush()
+    changed = session.info.get("changed_tables")
+    if changed:
+        bump_table_versions(session.connection(), changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_after_commit(session):
+    if session.info.pop("changed_tables", None):
+        table_versions.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_tables(session):
+    session.info.pop("changed_tables", None)
+
+
+# -----------------------------
+# LRU + TTL кэш
+# -----------------------------
+class ResponseCache:
+    """Потокобезопасный LRU-кэш с ограничением по числу записей, объему и TTL."""
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._size -= size
+
+
+def init_cache(app):
+    app.extensions["response_cache"] = ResponseCache(
+        max_entries=app.config["RESPONSE_CACHE_MAX_ENTRIES"],
+        max_bytes=app.config["RESPONSE_CACHE_MAX_BYTES"],
+        ttl=app.config["RESPONSE_CACHE_TTL"],
+    )
+    table_versions.refresh_interval = app.config["TABLE_VERSIONS_REFRESH_INTERVAL"]
+    with app.app_context():
+        _seed_table_versions()
+
+
+def _seed_table_versions():
+    # Строка для каждой таблицы, чтобы Last-Modified был известен с первого запроса.
+    # Пишет только в новую базу; без строк счетчики считаются нулевыми
+    known = set(db.session.scalars(select(TableVersion.table_name)))
+    missing = [name for name in db.metadata.tables if name not in known]
+    if not missing:
+        return
+    now = datetime.utcnow()
+    db.session.add_all(TableVersion(table_name=name, version=0, updated_at=now) for name in missing)
+    try:
+        db.session.commit()
+    except (OperationalError, IntegrityError):
+        # База только для чтения или строки уже добавил соседний воркер
+        db.session.rollback()
+
+
+def _request_key(tables, versions):
+    # host_url входит в ключ, т.к. _absolute_url встраивает его в ответ
+    args = tuple(sorted(request.args.items(multi=True)))
+    return (request.host_url, request.path, args, tables, versions)
+
+
+def _etag(key):
+    salt = current_app.config["ETAG_SALT"]
+    return hashlib.sha1(repr((salt, key)).encode("utf-8")).hexdigest()
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        # Клиент мог получить сжатый вариант ответа с ETag "<etag>-<кодировка>"
+        variants = (etag, *(f"{etag}-{encoding}" for encoding in available_encodings()))
+        return any(request.if_none_match.contains(variant) for variant in variants)
+    if request.if_modified_since and last_modified:
+        # HTTP-даты имеют точность до секунды
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def _set_validators(response, etag, last_modified):
+    encoding = response.headers.get("Content-Encoding")
+    response.set_etag(f"{etag}-{encoding}" if encoding else etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Клиент может хранить ответ, но обязан перепроверять его при каждом запросе
+    response.cache_control.no_cache = True
+
+
+def cached_response(*models, when=None):
+    """Кэширует ответ эндпоинта до изменения любой из указанных моделей.
+
+    Заодно выставляет ETag/Last-Modified и отвечает 304 на условные запросы
+    до выполнения каких-либо запросов к базе и сериализации. ``when`` —
+    необязательное условие: если оно ложно, ответ не кэшируется (например,
+    для случайной выдачи).
+    """
+    tables = tuple(sorted({_table_name(m) for m in models}))
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if when is not None and not when():
+                return view(*args, **kwargs)
+
+            versions = table_versions.get(tables)
+            last_modified = table_versions.last_modified(tables)
+            key = _request_key(tables, versions)
+            etag = _etag(key)
+
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+                _set_validators(response, etag, last_modified)
+                return response
+
+            cache = current_app.extensions.get("response_cache")
+            if cache is None or not current_app.config["RESPONSE_CACHE_ENABLED"]:
+                response = make_response(view(*args, **kwargs))
+            else:
+                response = _cached_call(cache, key, negotiate_encoding(), view, args, kwargs)
+
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
+
+
+def cached_value(key, models, compute, size=256):
+    """Кэширует произвольное значение (например, COUNT) до изменения указанных моделей.
+
+    ``size`` — оценка объема в байтах или функция, вычисляющая её по значению.
+    """
+    tables = tuple(sorted({_table_name(m) for m in models}))
+    cache = current_app.extensions.get("response_cache")
+    if cache is None or not current_app.config["RESPONSE_CACHE_ENABLED"]:
+        return compute()
+    full_key = ("value", key, tables, table_versions.get(tables))
+    entry = cache.get(full_key)
+    if entry is not None:
+        return entry[0]
+    value = compute()
+    cache.set(full_key, (value,), size(value) if callable(size) else size)
+    return value
+
+
+def _cached_call(cache, key, encoding, view, args, kwargs):
+    # Сжатые варианты хранятся отдельными записями, чтобы не сжимать ответ на каждый запрос
+    entry = cache.get((key, encoding))
+    if entry is not None:
+        response = _restore(entry)
+        response.headers["X-Cache"] = "HIT"
+        return response
+
+    entry = cache.get((key, None)) if encoding else None
+    if entry is not None:
+        response = _restore(entry)
+    else:
+        response = make_response(view(*args, **kwargs))
+        if response.status_code not in CACHEABLE_STATUSES or response.is_streamed:
+            return response
+        _store(cache, (key, None), response)
+
+    if encoding:
+        encode_response(response, encoding)
+        _store(cache, (key, encoding), response)
+    response.headers["X-Cache"] = "MISS"
+    return response
+
+
+def _store(cache, key, response):
+    body = response.get_data()
+    cache.set(key, (body, response.status_code, list(response.headers.items())), len(body))
+
+
+def _restore(entry):
+    body, status, headers = entry
+    return current_app.response_class(body, status=status, headers=headers)
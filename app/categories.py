@@ -0,0 +1,71 @@
+"""Снимок дерева категорий товаров.
+
+Дерево (id, parent_id, slug) читается одним запросом и кэшируется до
+следующего изменения таблицы product_category, поэтому выборка «категория и
+все её потомки» не требует обращений к базе.
+"""
+from .cache import cached_value
+from .models import db, ProductCategory
+
+
+class CategoryTree:
+    def __init__(self, rows):
+        self.parents = {}
+        self.children = {}
+        self.ids_by_slug = {}
+        for category_id, parent_id, slug in rows:
+            self.parents[category_id] = parent_id
+            self.ids_by_slug[slug] = category_id
+            self.children.setdefault(parent_id, []).append(category_id)
+
+    def __contains__(self, category_id):
+        return category_id in self.parents
+
+    def descendant_ids(self, category_id):
+        """Id категории и всех её потомков на любой глубине."""
+        if category_id not in self.parents:
+            return []
+        result = []
+        seen = set()
+        stack = [category_id]
+        while stack:
+            current = stack.pop()
+            # Защита от циклов, которые можно случайно создать в админке
+            if current in seen:
+                continue
+            seen.add(current)
+            result.append(current)
+            stack.extend(self.children.get(current, ()))
+        return result
+
+    def roots(self):
+        return [cid for cid, parent in self.parents.items() if parent is None or parent not in self.parents]
+
+
+def _load_tree():
+    rows = db.session.execute(
+        db.select(ProductCategory.id, ProductCategory.parent_category_id, ProductCategory.slug)
+    ).all()
+    return CategoryTree(rows)
+
+
+def category_tree():
+    return cached_value("category_tree", (ProductCategory,), _load_tree, size=64 * 1024)
+
+
+def build_nested(categories, serialize):
+    """Собирает вложенное дерево из списка категорий: каждому узлу добавляется ``children``."""
+    by_id = {c.id: c for c in categories}
+    tree = CategoryTree((c.id, c.parent_category_id, c.slug) for c in categories)
+    seen = set()
+
+    def build(category_id):
+        seen.add(category_id)
+        node = serialize(by_id[category_id])
+        node["children"] = [build(child) for child in tree.children.get(category_id, ()) if child not in seen]
+        return node
+
+    result = [build(root) for root in tree.roots()]
+    # Категории, попавшие в цикл, недостижимы от корней — выводим их на верхний уровень
+    result.extend(build(c.id) for c in categories if c.id not in seen)
+    return result
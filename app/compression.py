@@ -0,0 +1,101 @@
+"""Сжатие JSON-ответов API (gzip, brotli — если установлен пакет brotli).
+
+Для кэшируемых эндпоинтов сжатые байты хранятся в кэше ответов отдельно для
+каждой кодировки (см. app/cache.py), поэтому CPU на сжатие тратится только
+при промахе кэша. Остальные ответы API сжимаются в after_request, а потоковые
+(выгрузки) — по мере генерации, см. streamed_response.
+"""
+import gzip
+import zlib
+
+from flask import Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # brotli — необязательная зависимость
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/x-ndjson")
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding():
+    """Лучшая кодировка из Accept-Encoding, которую мы умеем, или None."""
+    if not current_app.config["COMPRESSION_ENABLED"]:
+        return None
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=current_app.config["COMPRESSION_BROTLI_QUALITY"])
+    return gzip.compress(body, compresslevel=current_app.config["COMPRESSION_GZIP_LEVEL"], mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """Сжимает поток байтов по мере генерации, не собирая его в памяти."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=current_app.config["COMPRESSION_BROTLI_QUALITY"])
+        finish = compressor.finish
+        process = compressor.process
+    else:
+        # wbits=31 — формат gzip (заголовок и CRC), а не «голый» deflate
+        compressor = zlib.compressobj(current_app.config["COMPRESSION_GZIP_LEVEL"], zlib.DEFLATED, 31)
+        finish = compressor.flush
+        process = compressor.compress
+    for chunk in chunks:
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def streamed_response(chunks, mimetype):
+    """Потоковый ответ, сжатый кодировкой из Accept-Encoding (если она есть)."""
+    encoding = negotiate_encoding()
+    response = Response(compress_stream(chunks, encoding) if encoding else chunks, mimetype=mimetype)
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def is_compressible(response):
+    return (
+        response.status_code == 200
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and "Content-Encoding" not in response.headers
+        and not response.direct_passthrough
+        and not response.is_streamed
+    )
+
+
+def encode_response(response, encoding):
+    """Сжимает тело ответа, если оно не меньше COMPRESSION_MIN_SIZE."""
+    response.vary.add("Accept-Encoding")
+    if encoding is None or not is_compressible(response):
+        return response
+    body = response.get_data()
+    if len(body) < current_app.config["COMPRESSION_MIN_SIZE"]:
+        return response
+    set_encoded_body(response, compress(body, encoding), encoding)
+    return response
+
+
+def set_encoded_body(response, body, encoding):
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    # Сильный ETag должен различаться для разных кодировок
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+
+
+def init_compression(blueprint):
+    @blueprint.after_request
+    def _compress_response(response):
+        return encode_response(response, negotiate_encoding())
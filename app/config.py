@@ -19,18 +19,94 @@ class Config:
         f"sqlite:///{os.path.join(INSTANCE_PATH, 'database.db')}"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # PRAGMA для каждого нового соединения с SQLite (см. ProductionConfig)
+    SQLITE_PRAGMAS = {}
+    # GET-запросы публичного API читают через отдельный движок только для чтения
+    # (см. app/database.py): реплику из DATABASE_READ_URL или ту же SQLite-базу с mode=ro
+    API_READ_ONLY_ENGINE = True
+    SQLALCHEMY_READ_DATABASE_URI = os.environ.get("DATABASE_READ_URL")
 
     BABEL_TRANSLATION_DIRECTORIES = "translations"
     TEMPLATES_AUTO_RELOAD = True
+    # Статика без хэша в имени (css/js, старые загрузки) перепроверяется каждый раз;
+    # загрузки с хэш-именами кэшируются надолго (см. app/uploads.py)
     SEND_FILE_MAX_AGE_DEFAULT = 0
+    UPLOADS_MAX_AGE = 365 * 24 * 60 * 60  # секунды
 
     # Папка для загрузок
     UPLOAD_FOLDER = UPLOAD_FOLDER
 
+    # Кэш ответов публичного API (см. app/cache.py)
+    RESPONSE_CACHE_ENABLED = True
+    RESPONSE_CACHE_MAX_ENTRIES = 2048
+    RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    RESPONSE_CACHE_TTL = 300  # секунды
+    # Как часто воркер перечитывает счетчики изменений таблиц из базы
+    TABLE_VERSIONS_REFRESH_INTERVAL = 1.0  # секунды
+    # Меняйте при изменении формата ответов, чтобы сбросить ETag у клиентов
+    ETAG_SALT = "1"
+
+    # Сжатие ответов API (см. app/compression.py)
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIN_SIZE = 1024  # байты; меньшие ответы отдаются как есть
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 5
+
+    # Уменьшенные копии загруженных изображений (см. app/images.py)
+    IMAGE_VARIANTS_ENABLED = True
+    IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+    IMAGE_VARIANT_QUALITY = 80
+    IMAGE_WORKERS = 2  # процессы для генерации
+
+    # Отложенная пакетная запись POST-запросов (см. app/writebehind.py)
+    WRITE_BEHIND_ENABLED = True
+    WRITE_BEHIND_QUEUE_SIZE = 10000  # при переполнении POST отвечает 503
+    WRITE_BEHIND_BATCH_SIZE = 200
+    WRITE_BEHIND_MAX_DELAY = 0.05  # секунды ожидания, пока набирается пачка
+    WRITE_BEHIND_SHUTDOWN_TIMEOUT = 10  # секунды на дозапись очереди при остановке
+
+    # Метрики запросов: /metrics и заголовок Server-Timing (см. app/metrics.py)
+    METRICS_ENABLED = True
+    METRICS_SERVER_TIMING = False
+    # Общий каталог для воркеров gunicorn; очищайте его перед запуском
+    METRICS_DIR = os.environ.get("METRICS_DIR")
+    METRICS_FLUSH_INTERVAL = 5.0  # секунды между сохранениями счетчиков процесса
+
+    # Сериализация JSON через orjson, если он установлен (см. app/jsonprovider.py)
+    FAST_JSON_ENABLED = True
+
+    # Журнал медленных SQL-запросов (см. app/slowlog.py); None — выключен
+    SLOW_QUERY_THRESHOLD_MS = 200
+    SLOW_QUERY_EXPLAIN = True
+    SLOW_QUERY_LOG = os.environ.get("SLOW_QUERY_LOG", os.path.join(INSTANCE_PATH, "slow_queries.log"))
+    SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS = 5
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    METRICS_SERVER_TIMING = True
 
 
 class ProductionConfig(Config):
     DEBUG = False
+
+    # Профиль SQLite (см. app/database.py). WAL позволяет читать во время записи,
+    # synchronous=NORMAL в режиме WAL безопасен при падении процесса и не делает
+    # fsync на каждый коммит; busy_timeout — сколько ждать блокировку вместо
+    # мгновенной ошибки "database is locked".
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,  # мс
+        "cache_size": -64000,  # отрицательное значение — в КиБ, т.е. 64 МБ на соединение
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    }
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        # Соединения переиспользуются и не теряют прогретый кэш страниц
+        "pool_size": 10,
+        "max_overflow": 10,
+        "pool_timeout": 10,
+        "connect_args": {"timeout": 5},
+    }
@@ -0,0 +1,97 @@
+"""Настройка соединений с базой.
+
+Для SQLite при каждом новом соединении выполняются PRAGMA из конфига
+``SQLITE_PRAGMAS`` (WAL, synchronous, размер кэша страниц, mmap, busy_timeout).
+Профиль для продакшена задается в ``ProductionConfig``.
+
+Публичные GET-запросы API читают через отдельный движок только для чтения:
+реплику из ``SQLALCHEMY_READ_DATABASE_URI`` или ту же SQLite-базу, открытую
+с ``mode=ro``. Сессия сама выбирает движок (см. RoutingSession), поэтому код
+эндпоинтов по-прежнему работает с ``db.session``; админка, POST-запросы и
+любые записи идут в основной движок.
+"""
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+# PRAGMA, которые меняют файл базы и недоступны соединению только для чтения
+_WRITE_PRAGMAS = ("journal_mode",)
+
+
+class RoutingSession(Session):
+    """Сессия, которая в режиме чтения (см. use_read_only_session) отправляет
+    SELECT-запросы в движок только для чтения."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _read_only_requested() and not _is_write(clause):
+            engine = current_app.extensions.get("read_engine")
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _read_only_requested():
+    return has_app_context() and g.get("db_read_only", False)
+
+
+def _is_write(clause):
+    return clause is not None and getattr(clause, "is_dml", False)
+
+
+def use_read_only_session():
+    """Переключает сессию текущего запроса на чтение: запросы идут в движок
+    только для чтения, autoflush отключен (в GET-запросах нечего сбрасывать)."""
+    from .models import db
+
+    g.db_read_only = True
+    db.session.autoflush = False
+
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def _read_only_url(url):
+    """URL реплики из конфига или та же SQLite-база с mode=ro (None — не поддерживается)."""
+    configured = current_app.config.get("SQLALCHEMY_READ_DATABASE_URI")
+    if configured:
+        return make_url(configured)
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return None
+    if url.query.get("uri"):
+        return None  # база уже задана URI — не переписываем
+    return url.set(database=f"file:{url.database}", query={"mode": "ro", "uri": "true"})
+
+
+def _make_read_engine(app, engine):
+    url = _read_only_url(engine.url)
+    if url is None:
+        return None
+    read_engine = create_engine(url, **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    pragmas = app.config.get("SQLITE_PRAGMAS")
+    if pragmas and read_engine.dialect.name == "sqlite":
+        pragmas = {name: value for name, value in pragmas.items() if name not in _WRITE_PRAGMAS}
+        event.listen(read_engine, "connect", _apply_pragmas(pragmas))
+    return read_engine
+
+
+def init_database(app):
+    """Вызывается сразу после db.init_app, до первого соединения."""
+    from .models import db
+
+    pragmas = app.config.get("SQLITE_PRAGMAS")
+    with app.app_context():
+        if pragmas:
+            for engine in db.engines.values():
+                if engine.dialect.name == "sqlite":
+                    event.listen(engine, "connect", _apply_pragmas(pragmas))
+        read_engine = _make_read_engine(app, db.engine) if app.config["API_READ_ONLY_ENGINE"] else None
+    app.extensions["read_engine"] = read_engine
@@ -0,0 +1,241 @@
+"""Уменьшенные копии загруженных изображений.
+
+После сохранения модели в админке для каждого изображения в фоновом пуле
+процессов создаются копии нескольких ширин в WebP и в исходном формате.
+Они складываются в ``_variants/`` рядом с оригиналом вместе с манифестом
+``<имя>.json`` (размеры оригинала и список копий), который API отдает
+клиентам в виде srcset.
+"""
+import json
+import os
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+
+VARIANTS_DIR = "_variants"
+# В каком формате сохранять копии «в исходном формате» (GIF и прочие — в PNG)
+_SAVE_FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "png"}
+_MIME_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+_executor = None
+_executor_lock = threading.Lock()
+# Исходный файл -> (версия таблицы, манифест или None), см. _lookup_manifest
+_lookups = {}
+
+
+# -----------------------------
+# Генерация (выполняется в дочернем процессе)
+# -----------------------------
+def generate_variants(source, widths, quality):
+    """Создает копии ``source`` и манифест; возвращает путь к манифесту."""
+    from PIL import Image, ImageOps
+
+    directory, filename = os.path.split(source)
+    stem = os.path.splitext(filename)[0]
+    target_dir = os.path.join(directory, VARIANTS_DIR)
+    os.makedirs(target_dir, exist_ok=True)
+
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        width, height = image.size
+        ext = _SAVE_FORMATS.get(original.format, "png")
+        variants = []
+        for target_width in sorted({w for w in widths if w < width} | {width}):
+            target_height = max(1, round(height * target_width / width))
+            resized = image if target_width == width else image.resize((target_width, target_height), Image.LANCZOS)
+            for fmt in dict.fromkeys(("webp", ext)):
+                if fmt == ext and target_width == width:
+                    continue  # оригинал уже есть
+                name = f"{stem}-{target_width}w.{fmt}"
+                _save(resized, os.path.join(target_dir, name), fmt, quality)
+                variants.append({"file": name, "width": target_width, "height": target_height, "format": fmt})
+
+    manifest_path = os.path.join(target_dir, f"{stem}.json")
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump({"source": filename, "format": ext, "width": width, "height": height, "variants": variants}, fh)
+    os.replace(tmp_path, manifest_path)
+    return manifest_path
+
+
+def _save(image, path, fmt, quality):
+    if fmt == "jpg":
+        image.convert("RGB").save(path, "JPEG", quality=quality, optimize=True, progressive=True)
+    elif fmt == "webp":
+        image.save(path, "WEBP", quality=quality, method=4)
+    else:
+        image.save(path, "PNG", optimize=True)
+
+
+# -----------------------------
+# Очередь на генерацию
+# -----------------------------
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=current_app.config["IMAGE_WORKERS"])
+        return _executor
+
+
+def _source_path(path):
+    """Путь на диске для значения колонки вида "static/uploads/...".
+
+    None — для внешних URL и путей вне каталога static.
+    """
+    if not path or path.startswith(("http://", "https://")):
+        return None
+    relative = path.lstrip("/")
+    if relative.startswith("static/"):
+        relative = relative[len("static/"):]
+    full = os.path.normpath(os.path.join(current_app.static_folder, relative))
+    if not full.startswith(os.path.normpath(current_app.static_folder) + os.sep):
+        return None
+    return full
+
+
+def _manifest_path(source):
+    directory, filename = os.path.split(source)
+    return os.path.join(directory, VARIANTS_DIR, f"{os.path.splitext(filename)[0]}.json")
+
+
+def _is_stale(source):
+    manifest = _manifest_path(source)
+    return not os.path.exists(manifest) or os.path.getmtime(manifest) < os.path.getmtime(source)
+
+
+def schedule_variants(paths, table=None):
+    """Ставит в очередь генерацию копий для путей, у которых их еще нет.
+
+    Когда копии готовы, версия ``table`` увеличивается, чтобы закэшированные
+    ответы API получили srcset.
+    """
+    if not current_app.config["IMAGE_VARIANTS_ENABLED"]:
+        return []
+    widths = current_app.config["IMAGE_VARIANT_WIDTHS"]
+    quality = current_app.config["IMAGE_VARIANT_QUALITY"]
+    app = current_app._get_current_object()
+    futures = []
+    for path in paths:
+        source = _source_path(path)
+        if source is None or not os.path.isfile(source) or not _is_stale(source):
+            continue
+        future = _get_executor().submit(generate_variants, source, widths, quality)
+        future.add_done_callback(lambda f, source=source: _on_done(f, source, app, table))
+        futures.append(future)
+    return futures
+
+
+def _on_done(future, source, app, table):
+    _lookups.pop(source, None)
+    if future.exception() is not None:
+        app.logger.error("Image variants for %s failed: %s", source, future.exception())
+        return
+    if table:
+        from .cache import bump_table_versions, table_versions
+        from .models import db
+
+        with app.app_context(), db.engine.begin() as conn:
+            bump_table_versions(conn, [table])
+        table_versions.invalidate()
+
+
+def model_image_paths(model):
+    """Все пути к изображениям модели (по url_fields)."""
+    paths = []
+    for name in getattr(model, "url_fields", ()):
+        value = getattr(model, name, None)
+        if isinstance(value, list):
+            paths.extend(value)
+        elif value:
+            paths.append(value)
+    return paths
+
+
+# -----------------------------
+# Чтение манифестов для API
+# -----------------------------
+def image_variants(path, absolute_url_func=None, table=None):
+    """Размеры изображения и его копии в виде srcset или None, если копий нет."""
+    if not has_app_context():
+        return None
+    source = _source_path(path) if isinstance(path, str) else None
+    if source is None:
+        return None
+    manifest = _lookup_manifest(source, table)
+    if manifest is None:
+        return None
+
+    base = posixpath.join(posixpath.dirname(path), VARIANTS_DIR)
+    srcset = [
+        {
+            "url": _url(posixpath.join(base, v["file"]), absolute_url_func),
+            "width": v["width"],
+            "height": v["height"],
+            "type": _MIME_TYPES.get(v["format"], "image/" + v["format"]),
+        }
+        for v in manifest["variants"]
+    ]
+    # Сам оригинал — самый широкий вариант в исходном формате
+    srcset.append({
+        "url": _url(path, absolute_url_func),
+        "width": manifest["width"],
+        "height": manifest["height"],
+        "type": _MIME_TYPES.get(manifest["format"], "image/" + manifest["format"]),
+    })
+    return {"width": manifest["width"], "height": manifest["height"], "srcset": srcset}
+
+
+def _lookup_manifest(source, table):
+    """Манифест копий ``source`` без обращения к диску на каждый вызов.
+
+    Результат (и отсутствие копий тоже) запоминается по пути. Запись
+    сбрасывается, когда генерация копий завершилась в этом процессе (_on_done),
+    а копии, созданные другим воркером или CLI, видны после смены версии
+    таблицы ``table``, которую при этом увеличивает _on_done.
+    """
+    from .cache import table_versions
+
+    version = table_versions.get([table]) if table else None
+    cached = _lookups.get(source)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    try:
+        with open(_manifest_path(source), encoding="utf-8") as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        manifest = None
+    _lookups[source] = (version, manifest)
+    return manifest
+
+
+def _url(path, absolute_url_func):
+    return absolute_url_func(path) if absolute_url_func else path
+
+
+@click.command("images-generate")
+@click.option("--wait/--no-wait", default=True, help="Дождаться окончания генерации.")
+@with_appcontext
+def images_generate_command(wait):
+    """Создать уменьшенные копии для всех уже загруженных изображений."""
+    from .models import db
+
+    futures = []
+    for mapper in db.Model.registry.mappers:
+        model = mapper.class_
+        if getattr(model, "url_fields", ()):
+            paths = [path for obj in model.query for path in model_image_paths(obj)]
+            futures += schedule_variants(paths, model.__tablename__)
+    click.echo(f"Scheduled {len(futures)} images")
+    if wait:
+        for future in futures:
+            future.exception()
+        click.echo("Done")
+
+
+def init_images(app):
+    app.cli.add_command(images_generate_command)
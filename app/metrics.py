@@ -0,0 +1,318 @@
+"""Метрики производительности запросов.
+
+Для каждого запроса считаются SQL-запросы и их суммарное время (события
+``before/after_cursor_execute``), время сериализации ответа и общее время.
+С ``METRICS_SERVER_TIMING`` они отдаются в заголовке ``Server-Timing`` (видно
+во вкладке Network браузера), а гистограммы по эндпоинтам доступны на
+``/metrics`` в текстовом формате Prometheus.
+
+Под gunicorn с несколькими воркерами задайте ``METRICS_DIR`` (общий каталог,
+очищаемый перед запуском): каждый процесс периодически сохраняет свои
+счетчики в отдельный файл, а ``/metrics`` суммирует файлы всех процессов.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from flask import Response, current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = {
+    "http_request_duration_seconds": ("Total request processing time", DURATION_BUCKETS),
+    "http_request_db_seconds": ("Cumulative SQL execution time per request", DURATION_BUCKETS),
+    "http_request_db_queries": ("SQL statements executed per request", QUERY_BUCKETS),
+    "http_request_serialize_seconds": ("Response serialization time per request", DURATION_BUCKETS),
+}
+COUNTERS = {
+    "http_requests_total": "Requests by endpoint, method and status",
+    # Очередь отложенной записи (app/writebehind.py)
+    "write_behind_enqueued_total": "Rows accepted into the write-behind queue",
+    "write_behind_rejected_total": "Rows rejected because the write-behind queue was full",
+    "write_behind_written_total": "Rows committed by the write-behind writer",
+    "write_behind_failed_total": "Rows dropped after a failed write-behind insert",
+    "write_behind_lost_total": "Rows still queued when the write-behind writer was stopped",
+    "write_behind_batches_total": "Write-behind batches committed",
+    "write_behind_latency_seconds_total": "Cumulative time from enqueue to commit of written rows",
+}
+GAUGES = {
+    "write_behind_queue_depth": "Rows waiting in the write-behind queue",
+    "write_behind_queue_capacity": "Write-behind queue capacity",
+}
+
+
+# -----------------------------
+# Хранилище метрик процесса
+# -----------------------------
+class MetricsRegistry:
+    def __init__(self, directory=None, flush_interval=5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pid = None
+        self._collectors = []
+        self._reset()
+
+    def _reset(self):
+        # После fork дочерний процесс начинает с нуля и пишет в свой файл
+        self._pid = os.getpid()
+        self._histograms = {}  # (имя, метки) -> [счетчики корзин..., сумма, количество]
+        self._counters = {}  # (имя, метки) -> значение
+        self._path = None
+        self._flushed_at = time.monotonic()
+        if self.directory:
+            self._path = os.path.join(self.directory, f"metrics-{self._pid}-{uuid.uuid4().hex[:8]}.json")
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        with self._lock:
+            self._check_pid()
+            state = self._histograms.get((name, labels))
+            if state is None:
+                state = self._histograms[(name, labels)] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self._check_pid()
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + amount
+
+    def add_collector(self, collector):
+        """``collector()`` возвращает ({счетчик: значение}, {gauge: значение}) процесса;
+        значения снимаются при каждом сохранении и отдаче метрик."""
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        with self._lock:
+            self._check_pid()
+            snapshot = {
+                "histograms": [[name, list(labels), list(state)] for (name, labels), state in self._histograms.items()],
+                "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                "gauges": [],
+                "pid": self._pid,
+            }
+        for collector in self._collectors:
+            counters, gauges = collector()
+            snapshot["counters"] += [[name, [], value] for name, value in counters.items()]
+            snapshot["gauges"] += [[name, [], value] for name, value in gauges.items()]
+        return snapshot
+
+    def maybe_flush(self):
+        if self._path and time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self._path:
+            return
+        data = self.snapshot()
+        self._flushed_at = time.monotonic()
+        tmp = f"{self._path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+        os.replace(tmp, self._path)
+
+    def collect(self):
+        """Метрики всех процессов (или только текущего, если METRICS_DIR не задан)."""
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    snapshot = json.load(fh)
+            except (OSError, ValueError):
+                continue  # файл другого процесса могли удалить при очистке каталога
+            # Счетчики завершившихся воркеров остаются в сумме, текущие значения — нет
+            if not _is_alive(snapshot.get("pid")):
+                snapshot["gauges"] = []
+            snapshots.append(snapshot)
+        return merge(snapshots)
+
+
+def _is_alive(pid):
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge(snapshots):
+    # Значения всех процессов суммируются (для gauge — например, общая глубина очередей)
+    histograms, counters, gauges = {}, {}, {}
+    for snapshot in snapshots:
+        for name, labels, state in snapshot["histograms"]:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.setdefault(key, [0] * len(state))
+            for i, value in enumerate(state):
+                total[i] += value
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snapshot.get("gauges", ()):
+            key = (name, tuple(map(tuple, labels)))
+            gauges[key] = gauges.get(key, 0) + value
+    return {
+        "histograms": [[name, list(labels), state] for (name, labels), state in histograms.items()],
+        "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+        "gauges": [[name, list(labels), value] for (name, labels), value in gauges.items()],
+    }
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, **extra):
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def render(snapshot):
+    """Текстовый формат Prometheus (exposition format 0.0.4)."""
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        series = sorted((labels, state) for n, labels, state in snapshot["histograms"] if n == name)
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for labels, state in series:
+            cumulative = 0
+            for bound, value in zip(buckets, state):
+                cumulative += value
+                lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {state[-1]}")
+            lines.append(f"{name}_sum{_labels(labels)} {state[-2]}")
+            lines.append(f"{name}_count{_labels(labels)} {state[-1]}")
+    for kind, names in (("counter", COUNTERS), ("gauge", GAUGES)):
+        series = snapshot["counters" if kind == "counter" else "gauges"]
+        for name, help_text in names.items():
+            values = sorted((labels, value) for n, labels, value in series if n == name)
+            if not values and kind == "gauge":
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in values:
+                lines.append(f"{name}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# Замеры текущего запроса
+# -----------------------------
+class RequestTimings:
+    __slots__ = ("started", "queries", "db_time", "serialize_time")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+
+
+def _current():
+    return g.get("request_timings") if has_app_context() else None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current()
+    started = getattr(context, "_metrics_started", None)
+    if timings is not None and started is not None:
+        timings.queries += 1
+        timings.db_time += time.perf_counter() - started
+
+
+@contextmanager
+def serialization_timer():
+    """Засекает сериализацию; ленивые загрузки внутри блока учитываются как время базы."""
+    timings = _current()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    db_before = timings.db_time
+    try:
+        yield
+    finally:
+        timings.serialize_time += time.perf_counter() - started - (timings.db_time - db_before)
+
+
+def _start_request():
+    g.request_timings = RequestTimings()
+
+
+def _finish_request(response):
+    timings = g.pop("request_timings", None)
+    if timings is None:
+        return response
+    total = time.perf_counter() - timings.started
+    registry = current_app.extensions["metrics"]
+    labels = (("endpoint", request.endpoint or "unmatched"), ("method", request.method))
+    registry.observe("http_request_duration_seconds", labels, total)
+    registry.observe("http_request_db_seconds", labels, timings.db_time)
+    registry.observe("http_request_db_queries", labels, timings.queries)
+    registry.observe("http_request_serialize_seconds", labels, timings.serialize_time)
+    registry.inc("http_requests_total", labels + (("status", response.status_code),))
+    registry.maybe_flush()
+
+    if current_app.config["METRICS_SERVER_TIMING"]:
+        other = max(total - timings.db_time - timings.serialize_time, 0.0)
+        response.headers["Server-Timing"] = (
+            f'db;dur={timings.db_time * 1000:.2f};desc="{timings.queries} queries", '
+            f"serialize;dur={timings.serialize_time * 1000:.2f}, "
+            f"app;dur={other * 1000:.2f}, "
+            f"total;dur={total * 1000:.2f}"
+        )
+    return response
+
+
+def metrics_view():
+    snapshot = current_app.extensions["metrics"].collect()
+    return Response(render(snapshot), mimetype="text/plain; version=0.0.4")
+
+
+def init_metrics(app):
+    if not app.config["METRICS_ENABLED"]:
+        app.extensions["metrics"] = None
+        return
+    directory = app.config.get("METRICS_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    registry = MetricsRegistry(directory, app.config["METRICS_FLUSH_INTERVAL"])
+    app.extensions["metrics"] = registry
+    write_behind = app.extensions.get("write_behind")
+    if write_behind is not None:
+        registry.add_collector(write_behind.metrics)
+    if directory:
+        atexit.register(registry.flush)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -1,9 +1,132 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, inspect
+from sqlalchemy.orm import load_only, query_expression, with_expression
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from datetime import datetime
 
-db = SQLAlchemy()
+from .database import RoutingSession
+from .images import image_variants
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# Поддерживаемые языки; порядок — порядок отката, если перевода нет
+LANGUAGES = ("en", "ru", "tk")
+
+
+def localized_value(obj, base_name, lang):
+    """Значение поля <base_name>_<lang>, иначе первое непустое из en -> ru -> tk."""
+    for code in dict.fromkeys((lang, *LANGUAGES)):
+        value = getattr(obj, f"{base_name}_{code}", None)
+        if value:
+            return value
+    return None
+
+
+# Сериализация моделей для API
+class SerializerMixin:
+    # Ключи ответа to_dict() по порядку
+    serialize_fields = ()
+    # Поля, хранящиеся в трёх языковых колонках <name>_en/_ru/_tk
+    i18n_fields = ()
+    # Пути к файлам, которые превращаются в абсолютные URL
+    url_fields = ()
+    # Именованные наборы полей для ?view= (full — все поля)
+    views = {}
+
+    @classmethod
+    def select_fields(cls, fields=None, view=None):
+        """Проверяет запрошенный набор полей; None означает «все поля».
+
+        ``fields`` — список имен из serialize_fields (важнее, чем ``view``);
+        ``id`` включается всегда. Для неизвестных имен — ValueError.
+        """
+        if fields:
+            unknown = [name for name in fields if name not in cls.serialize_fields]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            names = fields
+        elif view and view != "full":
+            if view not in cls.views:
+                raise ValueError(f"Unknown view {view}")
+            names = cls.views[view]
+        else:
+            return None
+        return tuple(dict.fromkeys(("id", *names)))
+
+    def to_dict(self, absolute_url_func=None, lang=None, fields=None):
+        """Словарь для API.
+
+        Без ``lang`` возвращаются все языковые варианты (``name_en``, ``name_ru``, ...),
+        с ``lang`` — один ключ на поле (``name``) с откатом на другие языки.
+        ``fields`` ограничивает набор ключей (см. select_fields).
+        """
+        data = {}
+        for name in self.serialize_fields:
+            if fields is not None and name not in fields:
+                continue
+            if name in self.i18n_fields:
+                if lang:
+                    data[name] = self._localized(name, lang)
+                else:
+                    for code in LANGUAGES:
+                        data[f"{name}_{code}"] = getattr(self, f"{name}_{code}")
+            elif name in self.url_fields:
+                value = getattr(self, name)
+                data[name] = self._url(value, absolute_url_func)
+                # Размеры и уменьшенные копии (srcset), если они уже созданы
+                data[f"{name}_variants"] = self._variants(value, absolute_url_func, self.__tablename__)
+            else:
+                data[name] = getattr(self, name)
+        return data
+
+    def _localized(self, name, lang):
+        # Если языковые колонки не загружены (см. load_options), значение
+        # уже вычислено в SQL и лежит в <name>_l10n
+        if f"{name}_{lang}" in inspect(self).unloaded:
+            return getattr(self, f"{name}_l10n")
+        return localized_value(self, name, lang)
+
+    @staticmethod
+    def _variants(value, absolute_url_func, table=None):
+        if isinstance(value, list):
+            return [image_variants(v, absolute_url_func, table) for v in value]
+        return image_variants(value, absolute_url_func, table)
+
+    @staticmethod
+    def _url(value, absolute_url_func):
+        if isinstance(value, list):
+            return [absolute_url_func(v) for v in value] if absolute_url_func else value
+        return absolute_url_func(value) if absolute_url_func else value
+
+
+def load_options(model, lang=None, fields=None, required=()):
+    """Опции запроса, которые читают из базы только то, что попадет в ответ.
+
+    ``fields`` ограничивает список колонок (load_only). С ``lang`` языковые
+    колонки не загружаются вовсе: для каждого поля SQL вычисляет
+    COALESCE(<lang>, en, ru, tk) в атрибут <name>_l10n. ``required`` —
+    дополнительные колонки, нужные вызывающему коду (например, для курсора).
+    """
+    if not lang and fields is None:
+        return []
+    names = model.serialize_fields if fields is None else fields
+    columns = [getattr(model, name) for name in (*names, *required) if name not in model.i18n_fields]
+    if not lang:
+        columns += [
+            getattr(model, f"{name}_{code}")
+            for name in names if name in model.i18n_fields
+            for code in LANGUAGES
+        ]
+    options = [load_only(*columns)]
+    if lang:
+        for name in names:
+            if name not in model.i18n_fields:
+                continue
+            variants = [getattr(model, f"{name}_{code}") for code in dict.fromkeys((lang, *LANGUAGES))]
+            expression = func.coalesce(*[func.nullif(column, "") for column in variants])
+            options.append(with_expression(getattr(model, f"{name}_l10n"), expression))
+    return options
 
 # Админ-пользователь
 class AdminUser(UserMixin, db.Model):
@@ -19,26 +142,11 @@ class AdminUser(UserMixin, db.Model):
         return check_password_hash(self.password_hash, password)
 
 # Основная модель компании
-class Company(db.Model):
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name_en": self.name_en,
-            "name_ru": self.name_ru,
-            "name_tk": self.name_tk,
-            "mission_en": self.mission_en,
-            "mission_ru": self.mission_ru,
-            "mission_tk": self.mission_tk,
-            "vision_en": self.vision_en,
-            "vision_ru": self.vision_ru,
-            "vision_tk": self.vision_tk,
-            "phone": self.phone,
-            "email": self.email,
-            "address_en": self.address_en,
-            "address_ru": self.address_ru,
-            "address_tk": self.address_tk,
-            "map_coordinates": self.map_coordinates
-        }
+class Company(SerializerMixin, db.Model):
+    serialize_fields = (
+        "id", "name", "mission", "vision", "phone", "email", "address", "map_coordinates",
+    )
+    i18n_fields = ("name", "mission", "vision", "address")
     __tablename__ = "company"
     id = db.Column(db.Integer, primary_key=True)
     name_en = db.Column(db.String(250), nullable=True)
@@ -58,38 +166,21 @@ class Company(db.Model):
     map_coordinates = db.Column(db.String(100))
 
 # Сертификаты
-class Certificate(db.Model):
-    def to_dict(self, absolute_url_func=None):
-        image_url = absolute_url_func(self.image) if absolute_url_func else self.image
-        return {
-            "id": self.id,
-            "image": image_url,
-            "slug": getattr(self, "slug", None)
-        }
+class Certificate(SerializerMixin, db.Model):
+    serialize_fields = ("id", "image", "slug")
+    url_fields = ("image",)
     __tablename__ = "certificate"
     id = db.Column(db.Integer, primary_key=True)
     image = db.Column(db.String(250))
     slug = db.Column(db.String(120), unique=True, nullable=False)
 
 # Торговые марки
-class Brand(db.Model):
-    def to_dict(self, absolute_url_func=None):
-        logo_url = absolute_url_func(self.logo_image) if absolute_url_func else self.logo_image
-        return {
-            "id": self.id,
-            "name_en": self.name_en,
-            "name_ru": self.name_ru,
-            "name_tk": self.name_tk,
-            "subtitle_en": self.subtitle_en,
-            "subtitle_ru": self.subtitle_ru,
-            "subtitle_tk": self.subtitle_tk,
-            "slug": self.slug,
-            "description_en": self.description_en,
-            "description_ru": self.description_ru,
-            "description_tk": self.description_tk,
-            "company_id": self.company_id,
-            "logo_image": logo_url
-        }
+class Brand(SerializerMixin, db.Model):
+    serialize_fields = (
+        "id", "name", "subtitle", "slug", "description", "company_id", "logo_image",
+    )
+    i18n_fields = ("name", "subtitle", "description")
+    url_fields = ("logo_image",)
     __tablename__ = "brand"
     id = db.Column(db.Integer, primary_key=True)
     name_en = db.Column(db.String(120), nullable=False)
@@ -103,25 +194,14 @@ class Brand(db.Model):
     description_ru = db.Column(db.Text)
     description_tk = db.Column(db.Text)
     slug = db.Column(db.String(120), unique=True, nullable=False)
-    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False, index=True)
     company = db.relationship('Company', backref='brands')
 
 # Категории товаров
-class ProductCategory(db.Model):
-    def to_dict(self, absolute_url_func=None):
-        image_url = absolute_url_func(self.image) if absolute_url_func else self.image
-        return {
-            "id": self.id,
-            "name_en": self.name_en,
-            "name_ru": self.name_ru,
-            "name_tk": self.name_tk,
-            "slug": self.slug,
-            "description_en": self.description_en,
-            "description_ru": self.description_ru,
-            "description_tk": self.description_tk,
-            "image": image_url,
-            "parent_category_id": self.parent_category_id
-        }
+class ProductCategory(SerializerMixin, db.Model):
+    serialize_fields = ("id", "name", "slug", "description", "image", "parent_category_id")
+    i18n_fields = ("name", "description")
+    url_fields = ("image",)
     __tablename__ = "product_category"
     id = db.Column(db.Integer, primary_key=True)
     name_en = db.Column(db.String(120), nullable=False)
@@ -132,32 +212,29 @@ class ProductCategory(db.Model):
     description_ru = db.Column(db.Text)
     description_tk = db.Column(db.Text)
     image = db.Column(db.String(250))
-    parent_category_id = db.Column(db.Integer, db.ForeignKey('product_category.id'), nullable=True)
+    parent_category_id = db.Column(db.Integer, db.ForeignKey('product_category.id'), nullable=True, index=True)
     parent = db.relationship('ProductCategory', remote_side=[id], backref='subcategories')
 
 # Товары
-class Product(db.Model):
-    def to_dict(self, absolute_url_func=None):
-        image_url = absolute_url_func(self.image) if absolute_url_func else self.image
-        additional_images = [absolute_url_func(p) for p in (self.additional_images or [])] if absolute_url_func else (self.additional_images or [])
-        return {
-            "id": self.id,
-            "name_en": self.name_en,
-            "name_ru": self.name_ru,
-            "name_tk": self.name_tk,
-            "slug": self.slug,
-            "description_en": self.description_en,
-            "description_ru": self.description_ru,
-            "description_tk": self.description_tk,
-            "volume_or_weight": self.volume_or_weight,
-            "image": image_url,
-            "additional_images": additional_images,
-            "packaging_details_en": self.packaging_details_en,
-            "packaging_details_ru": self.packaging_details_ru,
-            "packaging_details_tk": self.packaging_details_tk,
-            "category_id": self.category_id,
-            "brand_id": self.brand_id
-        }
+class Product(SerializerMixin, db.Model):
+    serialize_fields = (
+        "id", "name", "slug", "description", "volume_or_weight", "image",
+        "additional_images", "packaging_details", "category_id", "brand_id",
+    )
+    i18n_fields = ("name", "description", "packaging_details")
+    url_fields = ("image", "additional_images")
+
+    views = {
+        "card": ("slug", "name", "image", "volume_or_weight", "category_id", "brand_id"),
+    }
+
+    def to_dict(self, absolute_url_func=None, lang=None, fields=None):
+        data = super().to_dict(absolute_url_func, lang, fields)
+        if "additional_images" in data:
+            data["additional_images"] = data["additional_images"] or []
+            data["additional_images_variants"] = data["additional_images_variants"] or []
+        return data
+
     __tablename__ = "product"
     id = db.Column(db.Integer, primary_key=True)
     name_en = db.Column(db.String(250), nullable=False)
@@ -173,33 +250,27 @@ class Product(db.Model):
     packaging_details_en = db.Column(db.Text)
     packaging_details_ru = db.Column(db.Text)
     packaging_details_tk = db.Column(db.Text)
-    category_id = db.Column(db.Integer, db.ForeignKey('product_category.id'), nullable=False)
-    brand_id = db.Column(db.Integer, db.ForeignKey('brand.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('product_category.id'), nullable=False, index=True)
+    brand_id = db.Column(db.Integer, db.ForeignKey('brand.id'), nullable=False, index=True)
     category = db.relationship('ProductCategory', backref='products')
     brand = db.relationship('Brand', backref='products')
 
 # Новости
-class News(db.Model):
-    def to_dict(self, absolute_url_func=None):
-        image_url = absolute_url_func(self.image) if absolute_url_func else self.image
-        return {
-            "id": self.id,
-            "title_en": self.title_en,
-            "title_ru": self.title_ru,
-            "title_tk": self.title_tk,
-            "subtitle_en": self.subtitle_en,
-            "subtitle_ru": self.subtitle_ru,
-            "subtitle_tk": self.subtitle_tk,
-            "slug": self.slug,
-            "publication_date": self.publication_date,
-            "image": image_url,
-            "body_text_en": self.body_text_en,
-            "body_text_ru": self.body_text_ru,
-            "body_text_tk": self.body_text_tk,
-            "reading_minutes": self.reading_minutes,
-            "company_id": self.company_id
-        }
+class News(SerializerMixin, db.Model):
+    serialize_fields = (
+        "id", "title", "subtitle", "slug", "publication_date", "image",
+        "body_text", "reading_minutes", "company_id",
+    )
+    i18n_fields = ("title", "subtitle", "body_text")
+    url_fields = ("image",)
+    views = {
+        "card": ("slug", "title", "subtitle", "publication_date", "image", "reading_minutes"),
+    }
     __tablename__ = "news"
+    # Индекс для сортировки и keyset-пагинации ленты новостей
+    __table_args__ = (
+        db.Index("ix_news_publication_date_id", "publication_date", "id"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title_en = db.Column(db.String(250), nullable=False)
     title_ru = db.Column(db.String(250), nullable=False)
@@ -214,7 +285,7 @@ class News(db.Model):
     body_text_ru = db.Column(db.Text)
     body_text_tk = db.Column(db.Text)
     reading_minutes = db.Column(db.Integer, default=5)
-    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False, index=True)
     company = db.relationship('Company', backref='news')
 
 # Сообщения из контактной формы
@@ -234,17 +305,24 @@ class NewsletterSubscriber(db.Model):
     subscription_date = db.Column(db.DateTime, default=datetime.utcnow)
 
 # Баннеры
-class Banner(db.Model):
-    def to_dict(self, absolute_url_func=None):
-        image_url = absolute_url_func(self.image) if absolute_url_func else self.image
-        return {
-            "id": self.id,
-            "image": image_url,
-            "link": self.link,
-            "slug": getattr(self, "slug", None)
-        }
+class Banner(SerializerMixin, db.Model):
+    serialize_fields = ("id", "image", "link", "slug")
+    url_fields = ("image",)
     __tablename__ = "banner"
     id = db.Column(db.Integer, primary_key=True)
     image = db.Column(db.String(250))
     link = db.Column(db.String(250))
     slug = db.Column(db.String(120), unique=True, nullable=False)
+
+# Версии таблиц для кэша ответов и ETag (см. app/cache.py)
+class TableVersion(db.Model):
+    __tablename__ = "table_version"
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# Атрибуты <поле>_l10n для значений на одном языке, вычисляемых в SQL (см. load_options)
+for _model in (Company, Brand, ProductCategory, Product, News):
+    for _name in _model.i18n_fields:
+        setattr(_model, f"{_name}_l10n", query_expression())
@@ -0,0 +1,100 @@
+"""Проверка планов «горячих» запросов API (SQLite EXPLAIN QUERY PLAN).
+
+``flask check-query-plans`` строит те же запросы, что и эндпоинты списка
+товаров, категорий и ленты новостей, и завершается с ошибкой, если какой-то
+из них читает таблицу целиком (SCAN без индекса), фильтр или следующая
+страница курсора не ищет по индексу (нет SEARCH), или лента новостей
+сортируется во временном B-дереве вместо обхода индекса. Команду удобно
+запускать в CI после `flask db upgrade`.
+"""
+from datetime import date
+from typing import NamedTuple
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, tuple_
+
+from .models import db, Brand, News, Product, ProductCategory
+
+PAGE = 20
+
+
+class HotQuery(NamedTuple):
+    name: str
+    statement: object
+    # Лента новостей должна идти по индексу, а не сортироваться во временном B-дереве
+    forbid_temp_sort: bool = False
+    # Фильтры и keyset-страницы должны искать по индексу (SEARCH), а не обходить
+    # его с начала (SCAN ... USING INDEX), иначе стоимость растет с номером страницы
+    require_search: bool = True
+
+
+def hot_queries():
+    feed_order = (News.publication_date.desc(), News.id.desc())
+    after_date = date(2024, 1, 1)
+    return [
+        HotQuery("products by category subtree",
+                 select(Product.id).where(Product.category_id.in_([1, 2, 3])).order_by(Product.id).limit(PAGE)),
+        HotQuery("products by category, next cursor page",
+                 select(Product.id).where(Product.category_id.in_([1, 2, 3]), Product.id > 100)
+                 .order_by(Product.id).limit(PAGE)),
+        HotQuery("products by brand", select(Product.id).where(Product.brand_id == 1)),
+        HotQuery("parent categories",
+                 select(ProductCategory.id).where(ProductCategory.parent_category_id.is_(None))),
+        HotQuery("subcategories", select(ProductCategory.id).where(ProductCategory.parent_category_id == 1)),
+        # Первая страница ленты — упорядоченный обход индекса с начала, это нормально
+        HotQuery("news feed", select(News.id).order_by(*feed_order).limit(PAGE),
+                 forbid_temp_sort=True, require_search=False),
+        HotQuery("news feed, next cursor page",
+                 select(News.id).where(tuple_(News.publication_date, News.id) < tuple_(after_date, 100))
+                 .order_by(*feed_order).limit(PAGE),
+                 forbid_temp_sort=True),
+        HotQuery("news feed, undated tail",
+                 select(News.id).where(News.publication_date.is_(None), News.id < 100)
+                 .order_by(News.id.desc()).limit(PAGE),
+                 forbid_temp_sort=True),
+        HotQuery("news by company", select(News.id).where(News.company_id == 1)),
+        HotQuery("brands by company", select(Brand.id).where(Brand.company_id == 1)),
+    ]
+
+
+def explain(connection, statement):
+    sql = str(statement.compile(connection, compile_kwargs={"literal_binds": True}))
+    return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def plan_problems(plan, forbid_temp_sort, require_search):
+    problems = []
+    if require_search and not any(detail.startswith("SEARCH ") for detail in plan):
+        problems.append("no index search: " + "; ".join(plan))
+    for detail in plan:
+        # "SCAN news USING INDEX ..." — упорядоченный обход индекса, это нормально
+        if detail.startswith("SCAN ") and " USING " not in detail:
+            problems.append(f"full table scan: {detail}")
+        if forbid_temp_sort and "TEMP B-TREE" in detail:
+            problems.append(f"sort without index: {detail}")
+    return problems
+
+
+@click.command("check-query-plans")
+@click.option("--verbose", "-v", is_flag=True, help="Печатать планы всех запросов.")
+@with_appcontext
+def check_query_plans_command(verbose):
+    """Проверить, что горячие запросы API используют индексы."""
+    if db.engine.dialect.name != "sqlite":
+        raise click.ClickException("EXPLAIN QUERY PLAN checks are implemented for SQLite only")
+    failed = 0
+    with db.engine.connect() as connection:
+        for query in hot_queries():
+            plan = explain(connection, query.statement)
+            problems = plan_problems(plan, query.forbid_temp_sort, query.require_search)
+            failed += bool(problems)
+            click.echo(f"{'FAIL' if problems else 'ok':<5} {query.name}")
+            for line in problems if not verbose else plan:
+                click.echo(f"      {line}")
+    if failed:
+        raise click.ClickException(f"{failed} queries do not use indexes")
+
+
+def init_queryplan(app):
+    app.cli.add_command(check_query_plans_command)
@@ -0,0 +1,91 @@
+"""Случайные рекомендации без ORDER BY random().
+
+Для каждой модели в памяти хранится компактный индекс: отсортированный массив
+id и значения группирующих колонок (категория/бренд у товаров, компания у
+новостей). Индекс кэшируется до изменения таблицы; случайные id выбираются в
+Python, а из базы читаются только выбранные строки по первичному ключу.
+"""
+import random
+from array import array
+from bisect import bisect_left
+
+from .cache import cached_value
+from .models import db
+
+# Значение группирующей колонки для NULL (id в базе всегда положительные)
+_NULL = -1
+
+
+class SampleIndex:
+    def __init__(self, rows, group_count):
+        rows = sorted(rows)
+        self.ids = array("q", (row[0] for row in rows))
+        self.keys = [array("q", (_NULL if row[g + 1] is None else row[g + 1] for row in rows))
+                     for g in range(group_count)]
+        self.groups = []
+        for keys in self.keys:
+            groups = {}
+            for item_id, key in zip(self.ids, keys):
+                if key != _NULL:
+                    groups.setdefault(key, array("q")).append(item_id)
+            self.groups.append(groups)
+
+    @property
+    def nbytes(self):
+        arrays = [self.ids, *self.keys] + [a for groups in self.groups for a in groups.values()]
+        return sum(a.itemsize * len(a) for a in arrays)
+
+    def group_keys(self, item_id):
+        pos = bisect_left(self.ids, item_id)
+        if pos == len(self.ids) or self.ids[pos] != item_id:
+            return None
+        return [keys[pos] for keys in self.keys]
+
+    def sample(self, k, exclude_id=None, related=False, rng=random):
+        """До ``k`` случайных id; при ``related`` сначала берутся id из тех же групп."""
+        pools = []
+        if related:
+            for groups, key in zip(self.groups, self.group_keys(exclude_id) or ()):
+                pools.append(groups.get(key, ()))
+        pools.append(self.ids)
+
+        chosen = []
+        seen = {exclude_id}
+        for pool in pools:
+            need = k - len(chosen)
+            if need <= 0:
+                break
+            # Берем с запасом на уже выбранные id, чтобы не повторять выборку
+            for pos in rng.sample(range(len(pool)), min(len(pool), need + len(seen))):
+                item_id = pool[pos]
+                if item_id not in seen:
+                    seen.add(item_id)
+                    chosen.append(item_id)
+                    if len(chosen) == k:
+                        break
+        return chosen
+
+
+def sample_index(model, *group_columns):
+    def load():
+        columns = [model.id, *(getattr(model, name) for name in group_columns)]
+        return SampleIndex(db.session.execute(db.select(*columns)).all(), len(group_columns))
+
+    key = ("sample_index", model.__tablename__, group_columns)
+    return cached_value(key, (model,), load, size=lambda index: index.nbytes)
+
+
+def recommend(model, group_columns, exclude_id, k=3, related=False, seed=None, query=None):
+    """Возвращает до ``k`` случайных объектов модели, кроме ``exclude_id``.
+
+    С ``seed`` выборка детерминирована (для одинаковых seed и exclude_id и
+    неизменной таблицы), что позволяет кэшировать ответ. ``query`` — базовый
+    запрос для чтения выбранных строк (по умолчанию ``model.query``).
+    """
+    rng = random.Random(f"{seed}:{exclude_id}") if seed is not None else random
+    ids = sample_index(model, *group_columns).sample(k, exclude_id, related, rng)
+    if not ids:
+        return []
+    query = model.query if query is None else query
+    items = {item.id: item for item in query.filter(model.id.in_(ids))}
+    return [items[item_id] for item_id in ids if item_id in items]
@@ -1,26 +1,67 @@
-from flask import Blueprint, request, jsonify
-from ..models import db, Company, Certificate, Brand, ProductCategory, Product, News, ContactMessage, NewsletterSubscriber, Banner
+import base64
+import json
+from datetime import date, datetime, timezone
+
+from flask import Blueprint, current_app, g, request, jsonify, stream_with_context
+from sqlalchemy import tuple_
+from werkzeug.http import parse_date
+from ..models import db, Company, Certificate, Brand, ProductCategory, Product, News, ContactMessage, NewsletterSubscriber, Banner, LANGUAGES, load_options
+from ..search import apply_product_search
+from ..cache import cached_response, cached_value, table_versions
+from ..categories import category_tree, build_nested
+from ..recommendations import recommend
+from ..compression import init_compression, streamed_response
+from ..database import use_read_only_session
+from ..metrics import serialization_timer
+from ..writebehind import (
+    QueueFull, submit_contact_message, submit_newsletter_subscriber,
+    write_behind_enabled,
+)
 
 api_bp = Blueprint("api", __name__)
+init_compression(api_bp)
 
 def success_response(data=None, message="Success"):
     """Создает успешный JSON ответ"""
     response = {"success": True, "message": message}
     if data is not None:
         response["data"] = data
-    return jsonify(response)
+    with serialization_timer():
+        return jsonify(response)
 
 def error_response(message="Error", status_code=400):
     """Создает ошибочный JSON ответ"""
     return jsonify({"success": False, "message": message}), status_code
 
 def get_or_404(model, object_id):
-    obj = model.query.get(object_id)
+    obj = _query(model).get(object_id)
     if not obj:
         return error_response(f"{model.__name__} with id {object_id} not found", 404)
     return obj
 
 
+@api_bp.before_request
+def _read_only_session():
+    # Чтения API не конкурируют с записями админки и POST-эндпоинтов
+    if request.method in ("GET", "HEAD"):
+        use_read_only_session()
+
+
+@api_bp.before_request
+def _parse_lang():
+    """?lang=en|ru|tk — вернуть поля только на одном языке."""
+    lang = request.args.get("lang") or None
+    if lang is not None and lang not in LANGUAGES:
+        return error_response(f"Unsupported lang {lang}", 400)
+    g.api_lang = lang
+
+
+def _lang():
+    return g.get("api_lang")
+
+
+
+
 def _absolute_url(path: str):
     if not path:
         return None
@@ -47,112 +88,256 @@ def _absolute_url(path: str):
             normalized = f"/static/{path}"
     
     return f"{prefix}{normalized}"
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+@api_bp.errorhandler(InvalidFields)
+def _invalid_fields(e):
+    return error_response(str(e), 400)
+
+
+def _fields(model):
+    """Набор полей из ?fields=a,b,c или ?view=card|full (None — все поля)."""
+    cache = g.setdefault("api_fields", {})
+    if model not in cache:
+        raw = request.args.get("fields")
+        fields = [name.strip() for name in raw.split(",") if name.strip()] if raw else None
+        try:
+            cache[model] = model.select_fields(fields, request.args.get("view"))
+        except ValueError as e:
+            raise InvalidFields(str(e))
+    return cache[model]
+
+
+def _query(model, required=()):
+    """model.query, который читает из базы только колонки, попадающие в ответ
+    (с учетом ?lang= и ?fields=/?view=). ``required`` — колонки, нужные самому эндпоинту."""
+    options = load_options(model, _lang(), _fields(model), required)
+    return model.query.options(*options) if options else model.query
+
+
+def _serialize(obj, absolute_url_func=_absolute_url):
+    with serialization_timer():
+        return obj.to_dict(absolute_url_func=absolute_url_func, lang=_lang(), fields=_fields(type(obj)))
+
+
+MAX_IDS = 100
+
+
+class InvalidIds(ValueError):
+    pass
+
+
+@api_bp.errorhandler(InvalidIds)
+def _invalid_ids(e):
+    return error_response(str(e), 400)
+
+
+def _ids():
+    """?ids=1,2,3 — список id без повторов (None, если параметр не передан)."""
+    raw = request.args.get("ids")
+    if raw is None:
+        return None
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(",") if part.strip()))
+    except ValueError:
+        raise InvalidIds("Invalid ids")
+    if len(ids) > MAX_IDS:
+        raise InvalidIds(f"Too many ids, at most {MAX_IDS} allowed")
+    return ids
+
+
+def _get_many(model, ids, absolute_url_func=_absolute_url):
+    """Объекты с указанными id одним запросом WHERE id IN (...), в порядке ids.
+
+    Несуществующие id пропускаются.
+    """
+    items = {i.id: i for i in _query(model).filter(model.id.in_(ids))} if ids else {}
+    return [_serialize(items[i], absolute_url_func=absolute_url_func) for i in ids if i in items]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_cursor(values):
+    """Кодирует ключ последней записи страницы в непрозрачный токен."""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise InvalidCursor(token)
+    if not isinstance(values, dict) or not isinstance(values.get("id"), int):
+        raise InvalidCursor(token)
+    return values
+
+
+def _wants_total():
+    return request.args.get("include_total", "").lower() in ("1", "true", "yes")
+
+
+def _cursor_meta(items, limit, next_key, total_func):
+    """Мета-данные для режима курсора: next_cursor и (по запросу) total."""
+    meta = {
+        "limit": limit,
+        "next_cursor": _encode_cursor(next_key(items[limit - 1])) if len(items) > limit else None,
+    }
+    if _wants_total():
+        meta["total"] = total_func()
+    return meta
     
 @api_bp.route("/companies", methods=["GET"])
+@cached_response(Company)
 def get_companies():
-    companies = Company.query.all()
-    data = [c.to_dict() for c in companies]
+    companies = _query(Company).all()
+    data = [_serialize(c, absolute_url_func=None) for c in companies]
     return success_response(data, "Companies retrieved successfully")
 
 @api_bp.route("/companies/<int:company_id>", methods=["GET"])
+@cached_response(Company)
 def get_company(company_id):
     c = get_or_404(Company, company_id)
     if isinstance(c, tuple):
         return c
-    return jsonify(c.to_dict())
+    return jsonify(_serialize(c, absolute_url_func=None))
 
 # ---------- CERTIFICATE ----------
 @api_bp.route("/certificates", methods=["GET"])
+@cached_response(Certificate)
 def get_certificates():
-    items = Certificate.query.all()
-    data = [i.to_dict(absolute_url_func=_absolute_url) for i in items]
+    ids = _ids()
+    if ids is not None:
+        return success_response(_get_many(Certificate, ids), "Certificates retrieved successfully")
+    items = _query(Certificate).all()
+    data = [_serialize(i) for i in items]
     return success_response(data, "Certificates retrieved successfully")
 
 @api_bp.route("/certificates/<int:item_id>", methods=["GET"])
+@cached_response(Certificate)
 def get_certificate(item_id):
     i = get_or_404(Certificate, item_id)
     if isinstance(i, tuple):
         return i
-    data = i.to_dict(absolute_url_func=_absolute_url)
+    data = _serialize(i)
     return success_response(data, "Certificate retrieved successfully")
 @api_bp.route("/certificates/<string:slug>", methods=["GET"])
+@cached_response(Certificate)
 def get_certificate_by_slug(slug):
-    i = Certificate.query.filter_by(slug=slug).first()
+    i = _query(Certificate).filter_by(slug=slug).first()
     if not i:
         return error_response(f"Certificate with slug {slug} not found", 404)
-    data = i.to_dict(absolute_url_func=_absolute_url)
+    data = _serialize(i)
     return success_response(data, "Certificate retrieved successfully")
 
 # ---------- BRAND ----------
 @api_bp.route("/brands", methods=["GET"])
+@cached_response(Brand)
 def get_brands():
-    items = Brand.query.all()
-    data = [i.to_dict(absolute_url_func=_absolute_url) for i in items]
+    ids = _ids()
+    if ids is not None:
+        return success_response(_get_many(Brand, ids), "Brands retrieved successfully")
+    items = _query(Brand).all()
+    data = [_serialize(i) for i in items]
     return success_response(data, "Brands retrieved successfully")
 
 @api_bp.route("/brands/<int:item_id>", methods=["GET"])
+@cached_response(Brand)
 def get_brand(item_id):
     i = get_or_404(Brand, item_id)
     if isinstance(i, tuple):
         return i
-    data = i.to_dict(absolute_url_func=_absolute_url)
+    data = _serialize(i)
     return success_response(data, "Brand retrieved successfully")
 
 # ---------- BRAND by SLUG ----------
 @api_bp.route("/brands/<string:slug>", methods=["GET"])
+@cached_response(Brand)
 def get_brand_by_slug(slug):
-    i = Brand.query.filter_by(slug=slug).first()
+    i = _query(Brand).filter_by(slug=slug).first()
     if not i:
         return error_response(f"Brand with slug {slug} not found", 404)
-    data = i.to_dict(absolute_url_func=_absolute_url)
+    data = _serialize(i)
     return success_response(data, "Brand retrieved successfully")
 
 # ---------- CATEGORY ----------
 @api_bp.route("/categories", methods=["GET"])
+@cached_response(ProductCategory)
 def get_categories():
-    items = ProductCategory.query.all()
-    data = [i.to_dict(absolute_url_func=_absolute_url) for i in items]
+    ids = _ids()
+    if ids is not None:
+        return success_response(_get_many(ProductCategory, ids), "Categories retrieved successfully")
+    items = _query(ProductCategory).all()
+    data = [_serialize(i) for i in items]
     return success_response(data, "Categories retrieved successfully")
 @api_bp.route("/categories/parents", methods=["GET"])
+@cached_response(ProductCategory)
 def get_parent_categories():
-    items = ProductCategory.query.filter_by(parent_category_id=None).all()
-    data = [i.to_dict(absolute_url_func=_absolute_url) for i in items]
+    items = _query(ProductCategory).filter_by(parent_category_id=None).all()
+    data = [_serialize(i) for i in items]
     return success_response(data, "Parent categories retrieved successfully")
 
+@api_bp.route("/categories/tree", methods=["GET"])
+@cached_response(ProductCategory)
+def get_category_tree():
+    # build_nested читает parent_category_id и slug даже при ?fields=
+    items = _query(ProductCategory, required=("parent_category_id", "slug")).order_by(ProductCategory.id).all()
+    data = build_nested(items, _serialize)
+    return success_response(data, "Category tree retrieved successfully")
+
 @api_bp.route("/categories/<int:item_id>", methods=["GET"])
+@cached_response(ProductCategory)
 def get_category(item_id):
     i = get_or_404(ProductCategory, item_id)
     if isinstance(i, tuple):
         return i
-    data = i.to_dict(absolute_url_func=_absolute_url)
+    data = _serialize(i)
     return success_response(data, "Category retrieved successfully")
 
 # ---------- PRODUCT ----------
 @api_bp.route("/products", methods=["GET"])
+@cached_response(Product, ProductCategory)
 def get_products():
+    ids = _ids()
+    if ids is not None:
+        products = _get_many(Product, ids, absolute_url_func=None)
+        return success_response({"products": products}, "Products retrieved successfully")
     category_id = request.args.get("category_id", type=int)
     category_slug = request.args.get("category", type=str)
     search_query= request.args.get("q", type=str)
     page = request.args.get("page", default=1, type=int)
     limit = request.args.get("limit", default=20, type=int)
-    query = Product.query
+    # Режим курсора включается наличием параметра cursor (пустой — первая страница)
+    cursor = request.args.get("cursor")
+    query = _query(Product)
 
     if category_id:
-        # Фильтрация по id категории и её дочерним
-        child_categories = ProductCategory.query.filter_by(parent_category_id=category_id).all()
-        child_ids = [cat.id for cat in child_categories]
-        all_category_ids = [category_id] + child_ids
+        # Фильтрация по id категории и всем её потомкам (дерево берется из кэша)
+        all_category_ids = category_tree().descendant_ids(category_id) or [category_id]
         query = query.filter(Product.category_id.in_(all_category_ids))
     elif category_slug:
-        # Фильтрация по слагу категории и её дочерним
-        parent_category = ProductCategory.query.filter_by(slug=category_slug).first()
-        if parent_category:
-            child_categories = ProductCategory.query.filter_by(parent_category_id=parent_category.id).all()
-            child_ids = [cat.id for cat in child_categories]
-            all_category_ids = [parent_category.id] + child_ids
+        # Фильтрация по слагу категории и всем её потомкам
+        tree = category_tree()
+        parent_category_id = tree.ids_by_slug.get(category_slug)
+        if parent_category_id is not None:
+            all_category_ids = tree.descendant_ids(parent_category_id)
             query = query.filter(Product.category_id.in_(all_category_ids))
         else:
             # Если категория не найдена — вернуть пустой список с мета
+            if cursor is not None:
+                meta = {"limit": limit, "next_cursor": None}
+                if _wants_total():
+                    meta["total"] = 0
+                return success_response({"products": [], "meta": meta})
             return success_response({
                 "products": [],
                 "meta": {
@@ -161,23 +346,19 @@ def get_products():
                     "last_page": 1
                 }
             })
-# фильтрация по поисковому запросу
+# фильтрация по поисковому запросу (FTS5, результаты отсортированы по релевантности)
     if search_query:
-        query = query.filter(
-            (Product.name_en.ilike(f"%{search_query}%")) |
-            (Product.name_ru.ilike(f"%{search_query}%")) |
-            (Product.name_tk.ilike(f"%{search_query}%")) |
-            (Product.description_en.ilike(f"%{search_query}%")) |
-            (Product.description_ru.ilike(f"%{search_query}%")) |
-            (Product.description_tk.ilike(f"%{search_query}%"))
-        )
+        query = apply_product_search(query, search_query, ranked=cursor is None)
+
+    if cursor is not None:
+        return _get_products_by_cursor(query, cursor, limit, (category_id, category_slug, search_query))
 
     total = query.count()
     last_page = max((total + limit - 1) // limit, 1)
     products = query.offset((page - 1) * limit).limit(limit).all()
 
     data = {
-        "products": [product.to_dict() for product in products],
+        "products": [_serialize(product, absolute_url_func=None) for product in products],
         "meta": {
             "total": total,
             "current_page": page,
@@ -186,47 +367,97 @@ def get_products():
     }
     return success_response(data, "Products retrieved successfully")
 
+
+def _get_products_by_cursor(query, cursor, limit, filters):
+    """Keyset-пагинация товаров по id: WHERE id > :last ORDER BY id без OFFSET."""
+    if limit < 1:
+        return error_response("Invalid limit", 400)
+    try:
+        after = _decode_cursor(cursor)
+    except InvalidCursor:
+        return error_response("Invalid cursor", 400)
+
+    total_query = query
+    if after:
+        query = query.filter(Product.id > after["id"])
+    products = query.order_by(Product.id).limit(limit + 1).all()
+
+    meta = _cursor_meta(
+        products, limit,
+        next_key=lambda p: {"id": p.id},
+        total_func=lambda: cached_value(("products.total", filters), (Product, ProductCategory), total_query.count),
+    )
+    data = {
+        "products": [_serialize(product, absolute_url_func=None) for product in products[:limit]],
+        "meta": meta,
+    }
+    return success_response(data, "Products retrieved successfully")
+
 @api_bp.route("/products/<int:item_id>", methods=["GET"])
+@cached_response(Product)
 def get_product(item_id):
     i = get_or_404(Product, item_id)
     if isinstance(i, tuple):
         return i
-    data = i.to_dict(absolute_url_func=_absolute_url)
+    data = _serialize(i)
     return success_response(data, "Product retrieved successfully")
-from sqlalchemy.sql.expression import func
+def _recommendation_args():
+    """Параметры рекомендаций: limit (1..20), related, seed."""
+    limit = min(max(request.args.get("limit", default=3, type=int), 1), 20)
+    related = request.args.get("related", "").lower() in ("1", "true", "yes")
+    return limit, related, request.args.get("seed")
+
+
+def _seeded():
+    # Без seed выдача случайная и не кэшируется
+    return "seed" in request.args
+
 
 @api_bp.route("/products/recommendations/<int:exclude_id>", methods=["GET"])
+@cached_response(Product, when=_seeded)
 def get_random_products(exclude_id):
-    items = Product.query.filter(Product.id != exclude_id).order_by(func.random()).limit(3).all()
-    data = [i.to_dict(absolute_url_func=_absolute_url) for i in items]
+    limit, related, seed = _recommendation_args()
+    # related: сначала товары той же категории, затем того же бренда
+    items = recommend(Product, ("category_id", "brand_id"), exclude_id, limit, related, seed, query=_query(Product))
+    data = [_serialize(i) for i in items]
     return success_response(data, "Random products retrieved successfully")
 
 # ---------- PRODUCT by SLUG ----------
 @api_bp.route("/products/<string:slug>", methods=["GET"])
+@cached_response(Product)
 def get_product_by_slug(slug):
-    i = Product.query.filter_by(slug=slug).first()
+    i = _query(Product).filter_by(slug=slug).first()
     if not i:
         return error_response(f"Product with slug {slug} not found", 404)
-    data = i.to_dict(absolute_url_func=_absolute_url)
+    data = _serialize(i)
     # category и brand можно добавить отдельно, если нужно
     return success_response(data, "Product retrieved successfully")
 
 # ---------- NEWS ----------
 @api_bp.route("/news", methods=["GET"])
+@cached_response(News)
 def get_news():
+    ids = _ids()
+    if ids is not None:
+        return success_response({"news": _get_many(News, ids)}, "News retrieved successfully")
     try:
         page = int(request.args.get("page", 1))
         limit = int(request.args.get("limit", 20))
     except ValueError:
         return error_response("Invalid page or limit", 400)
 
-    query = News.query.order_by(News.publication_date.desc())  # можно сортировать по дате публикации
+    cursor = request.args.get("cursor")
+    if cursor is not None:
+        return _get_news_by_cursor(cursor, limit)
+
+    # id — второй ключ сортировки, чтобы порядок новостей с одной датой был стабильным
+    query = _query(News).order_by(News.publication_date.desc(), News.id.desc())
 
     total = query.count()
     last_page = max((total + limit - 1) // limit, 1)
     items = query.offset((page - 1) * limit).limit(limit).all()
 
-    news_items = [i.to_dict(absolute_url_func=_absolute_url) for i in items]
+    news_items = [_serialize(i) for i in items]
     data = {
         "news": news_items,
         "meta": {
@@ -237,50 +468,286 @@ def get_news():
     }
     return success_response(data, "News retrieved successfully")
 
+
+def _get_news_by_cursor(cursor, limit):
+    """Keyset-пагинация новостей по (publication_date DESC, id DESC) через индекс ix_news_publication_date_id.
+
+    Новости без даты идут после всех датированных (в SQLite при DESC NULL
+    последние) и отдаются отдельной фазой: курсор с ``"d": null`` означает,
+    что датированные новости закончились.
+    """
+    if limit < 1:
+        return error_response("Invalid limit", 400)
+    try:
+        after = _decode_cursor(cursor)
+        after_date = date.fromisoformat(after["d"]) if after and after.get("d") else None
+    except (InvalidCursor, TypeError, ValueError):
+        return error_response("Invalid cursor", 400)
+
+    order = (News.publication_date.desc(), News.id.desc())
+    query = _query(News, required=("publication_date",))
+    if not after:
+        items = query.order_by(*order).limit(limit + 1).all()
+    elif after_date is None:
+        items = _undated_news(query, limit + 1, after["id"])
+    else:
+        # Сравнение пар (дата, id) — это диапазон по индексу (SEARCH), а не обход
+        # индекса с начала; строки с NULL в дате под условие не попадают
+        items = (
+            query.filter(tuple_(News.publication_date, News.id) < tuple_(after_date, after["id"]))
+            .order_by(*order)
+            .limit(limit + 1)
+            .all()
+        )
+        if len(items) <= limit:
+            # Датированные новости закончились — дополняем страницу новостями без даты
+            items += _undated_news(query, limit + 1 - len(items))
+
+    meta = _cursor_meta(
+        items, limit,
+        next_key=lambda n: {"d": n.publication_date.isoformat() if n.publication_date else None, "id": n.id},
+        total_func=lambda: cached_value("news.total", (News,), News.query.count),
+    )
+    data = {
+        "news": [_serialize(i) for i in items[:limit]],
+        "meta": meta,
+    }
+    return success_response(data, "News retrieved successfully")
+
+
+def _undated_news(query, limit, before_id=None):
+    query = query.filter(News.publication_date.is_(None))
+    if before_id is not None:
+        query = query.filter(News.id < before_id)
+    return query.order_by(News.id.desc()).limit(limit).all()
+
 @api_bp.route("/news/<int:item_id>", methods=["GET"])
+@cached_response(News)
 def get_news_item(item_id):
     i = get_or_404(News, item_id)
     if isinstance(i, tuple):
         return i
-    data = i.to_dict(absolute_url_func=_absolute_url)
+    data = _serialize(i)
     return success_response(data, "News item retrieved successfully")
 @api_bp.route("/news/recommendations/<int:exclude_id>", methods=["GET"])
+@cached_response(News, when=_seeded)
 def get_random_news(exclude_id):
-    items = News.query.filter(News.id != exclude_id).order_by(func.random()).limit(3).all()
-    data = [i.to_dict(absolute_url_func=_absolute_url) for i in items]
+    limit, related, seed = _recommendation_args()
+    # related: сначала новости той же компании
+    items = recommend(News, ("company_id",), exclude_id, limit, related, seed, query=_query(News))
+    data = [_serialize(i) for i in items]
     return success_response(data, "Random news retrieved successfully")
 
 # ---------- NEWS by SLUG ----------
 @api_bp.route("/news/<string:slug>", methods=["GET"])
+@cached_response(News)
 def get_news_by_slug(slug):
-    i = News.query.filter_by(slug=slug).first()
+    i = _query(News).filter_by(slug=slug).first()
     if not i:
         return error_response(f"News with slug {slug} not found", 404)
-    data = i.to_dict(absolute_url_func=_absolute_url)
+    data = _serialize(i)
     return success_response(data, "News item retrieved successfully")
 
 # ---------- BANNER ----------
 @api_bp.route("/banners", methods=["GET"])
+@cached_response(Banner)
 def get_banners():
-    items = Banner.query.all()
-    data = [i.to_dict(absolute_url_func=_absolute_url) for i in items]
+    ids = _ids()
+    if ids is not None:
+        return success_response(_get_many(Banner, ids), "Banners retrieved successfully")
+    items = _query(Banner).all()
+    data = [_serialize(i) for i in items]
     return success_response(data, "Banners retrieved successfully")
 
 @api_bp.route("/banners/<int:item_id>", methods=["GET"])
+@cached_response(Banner)
 def get_banner(item_id):
     i = get_or_404(Banner, item_id)
     if isinstance(i, tuple):
         return i
-    data = i.to_dict(absolute_url_func=_absolute_url)
+    data = _serialize(i)
     return success_response(data, "Banner retrieved successfully")
 @api_bp.route("/banners/<string:slug>", methods=["GET"])
+@cached_response(Banner)
 def get_banner_by_slug(slug):
-    i = Banner.query.filter_by(slug=slug).first()
+    i = _query(Banner).filter_by(slug=slug).first()
     if not i:
         return error_response(f"Banner with slug {slug} not found", 404)
-    data = i.to_dict(absolute_url_func=_absolute_url)
+    data = _serialize(i)
     return success_response(data, "Banner retrieved successfully")
 
+# ---------- BATCH ----------
+BATCH_MAX_REQUESTS = 20
+# Потоковые ответы и сам batch внутри batch не выполняются
+_BATCH_EXCLUDED_ENDPOINTS = {"api.batch", "api.export_products", "api.export_news"}
+
+
+@api_bp.route("/batch", methods=["POST"])
+def batch():
+    """Несколько GET-запросов к API за один HTTP-запрос.
+
+    Тело: {"requests": ["/products/slug?lang=ru", ...]} или {"requests": {"ключ": "/brands/1", ...}}.
+    Запросы выполняются внутри процесса по очереди с общей сессией базы и
+    общим кэшем ответов; результат — {ключ: {"status": код, "body": JSON}}.
+    """
+    data = request.get_json(silent=True) or {}
+    requests_ = data.get("requests")
+    if isinstance(requests_, list):
+        requests_ = {path: path for path in requests_}
+    if not isinstance(requests_, dict) or not requests_:
+        return error_response("requests must be a non-empty list or object of paths", 400)
+    if len(requests_) > BATCH_MAX_REQUESTS:
+        return error_response(f"Too many requests, at most {BATCH_MAX_REQUESTS} allowed", 400)
+    if not all(isinstance(path, str) and path.startswith("/") for path in requests_.values()):
+        return error_response("Each request must be a path starting with /", 400)
+
+    prefix = request.path[: -len("/batch")]
+    results = {str(key): _dispatch_get(prefix, path) for key, path in requests_.items()}
+    return success_response(results, "Batch processed")
+
+
+def _dispatch_get(prefix, path):
+    if not path.startswith(prefix + "/"):
+        path = prefix + path
+    # Подзапрос работает в том же контексте приложения (та же сессия базы),
+    # но g у него свой: там хранятся lang и fields текущего запроса
+    saved = dict(g.__dict__)
+    g.__dict__.clear()
+    try:
+        with current_app.test_request_context(path, method="GET", base_url=request.host_url):
+            if request.routing_exception is None and (
+                request.blueprint != api_bp.name or request.endpoint in _BATCH_EXCLUDED_ENDPOINTS
+            ):
+                return {"status": 400, "body": {"success": False, "message": "Path is not allowed in batch"}}
+            response = current_app.full_dispatch_request()
+            body = response.get_json(silent=True)
+            if body is None:
+                # Стандартные страницы ошибок Flask (404, 405) — HTML
+                body = {"success": False, "message": response.status}
+            return {"status": response.status_code, "body": body}
+    finally:
+        g.__dict__.clear()
+        g.__dict__.update(saved)
+
+
+# ---------- HOME (bundle) ----------
+HOME_NEWS_LIMIT = 3
+
+
+@api_bp.route("/home", methods=["GET"])
+@cached_response(Banner, ProductCategory, Brand, News, Company)
+def get_home():
+    """Данные главной страницы одним запросом: баннеры, корневые категории, бренды,
+    последние новости и компания."""
+    news_limit = request.args.get("news_limit", default=HOME_NEWS_LIMIT, type=int)
+    company_id = request.args.get("company_id", default=1, type=int)
+    if news_limit < 0:
+        return error_response("Invalid news_limit", 400)
+
+    # У каждой секции свой набор полей, поэтому ?fields=/?view= здесь не применяются
+    g.api_fields = dict.fromkeys((Banner, ProductCategory, Brand, News, Company))
+
+    company = _query(Company).get(company_id)
+    news = (
+        _query(News)
+        .order_by(News.publication_date.desc(), News.id.desc())
+        .limit(news_limit)
+        .all()
+    )
+    data = {
+        "banners": [_serialize(i) for i in _query(Banner).all()],
+        "categories": [_serialize(i) for i in _query(ProductCategory).filter_by(parent_category_id=None).all()],
+        "brands": [_serialize(i) for i in _query(Brand).all()],
+        "news": [_serialize(i) for i in news],
+        "company": _serialize(company, absolute_url_func=None) if company else None,
+    }
+    return success_response(data, "Home page data retrieved successfully")
+
+
+# ---------- EXPORT (NDJSON) ----------
+EXPORT_CHUNK_SIZE = 500
+
+
+class InvalidSince(ValueError):
+    pass
+
+
+def _parse_since():
+    """?since= в ISO 8601 или в формате HTTP-даты (значение Last-Modified прошлой выгрузки)."""
+    raw = request.args.get("since")
+    if not raw:
+        return None
+    try:
+        since = datetime.fromisoformat(raw)
+    except ValueError:
+        since = parse_date(raw)
+        if since is None:
+            raise InvalidSince(raw)
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+
+def _export_response(query, model, absolute_url_func=_absolute_url):
+    """Все объекты запроса по одному JSON на строку; из базы читаются порциями.
+
+    ``absolute_url_func`` — тот же, что у списочного эндпоинта модели, чтобы
+    строки выгрузки совпадали с объектами списка.
+    """
+    def generate():
+        dumps = current_app.json.dumps
+        lines = []
+        for obj in query.yield_per(EXPORT_CHUNK_SIZE):
+            lines.append(dumps(_serialize(obj, absolute_url_func=absolute_url_func)))
+            if len(lines) == EXPORT_CHUNK_SIZE:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    response = streamed_response(stream_with_context(generate()), "application/x-ndjson")
+    # Время последнего изменения таблицы (для новостей — и значение для since)
+    last_modified = table_versions.last_modified([model.__tablename__])
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+
+@api_bp.route("/products/export", methods=["GET"])
+def export_products():
+    """Выгрузка всех товаров (NDJSON) для синхронизации внешних систем.
+
+    У товаров нет даты изменения строки, поэтому выгрузка всегда полная
+    (``after_id`` — только для продолжения прерванной); ``since`` не поддерживается.
+    """
+    if "since" in request.args:
+        return error_response("since is not supported for products, export the full catalog", 400)
+    after_id = request.args.get("after_id", default=0, type=int)
+    query = _query(Product).filter(Product.id > after_id).order_by(Product.id)
+    # Пути изображений относительные, как в /products
+    return _export_response(query, Product, absolute_url_func=None)
+
+
+@api_bp.route("/news/export", methods=["GET"])
+def export_news():
+    """Выгрузка всех новостей (NDJSON).
+
+    ``since`` отбирает новости по дате публикации (``publication_date >= since``),
+    а не по времени изменения: правки уже опубликованных старых новостей и
+    новости без даты в такую выгрузку не попадают, для них нужна полная выгрузка.
+    """
+    try:
+        since = _parse_since()
+    except InvalidSince:
+        return error_response("Invalid since", 400)
+    after_id = request.args.get("after_id", default=0, type=int)
+
+    query = _query(News).filter(News.id > after_id)
+    if since is not None:
+        query = query.filter(News.publication_date >= since.date())
+    return _export_response(query.order_by(News.id), News)
+
+
 # ---------- CONTACT MESSAGE (only POST) ----------
 @api_bp.route("/contact_messages", methods=["POST"])
 def create_contact_message():
@@ -292,6 +759,11 @@ def create_contact_message():
     
         name_value = (data.get('name') or data.get('full_name') or '').strip()
 
+        if write_behind_enabled():
+            # 202 — принято в очередь, без идентификатора (см. app/writebehind.py)
+            submit_contact_message(name_value or None, data['email'], data['message'])
+            return success_response(message="Contact message accepted"), 202
+
         msg = ContactMessage(
             name=name_value or None,
             email=data['email'],
@@ -300,6 +772,8 @@ def create_contact_message():
         db.session.add(msg)
         db.session.commit()
         return success_response({"id": msg.id}, "Contact message created successfully"), 201
+    except QueueFull:
+        return _queue_full_response()
     except Exception as e:
         return error_response(f"Error creating contact message: {str(e)}", 500)
 
@@ -314,6 +788,11 @@ def create_newsletter_subscriber():
         if not email:
             return error_response("Email field is required", 400)
 
+        if write_behind_enabled():
+            # Повторная подписка не ошибка: писатель пропускает существующие email
+            submit_newsletter_subscriber(email)
+            return success_response(message="Newsletter subscription accepted"), 202
+
         # Idempotent create: if exists, return 200 with existing id
         existing = NewsletterSubscriber.query.filter_by(email=email).first()
         if existing:
@@ -323,5 +802,13 @@ def create_newsletter_subscriber():
         db.session.add(sub)
         db.session.commit()
         return success_response({"id": sub.id}, "Newsletter subscriber created successfully"), 201
+    except QueueFull:
+        return _queue_full_response()
     except Exception as e:
         return error_response(f"Error creating newsletter subscriber: {str(e)}", 500)
+
+
+def _queue_full_response():
+    response, status = error_response("Server is busy, please retry later", 503)
+    response.headers["Retry-After"] = "1"
+    return response, status
@@ -0,0 +1,213 @@
+"""Полнотекстовый поиск по товарам на SQLite FTS5.
+
+Индекс хранится в теневой виртуальной таблице ``product_fts`` (rowid = product.id)
+и обновляется событиями маппера ``Product``. Таблицу создает миграция или
+``flask search-reindex``; при запуске приложение только проверяет, есть ли она.
+Если база не SQLite, сборка SQLite без FTS5 или индекс еще не создан — поиск
+откатывается на старый ILIKE по шести колонкам.
+"""
+import re
+
+import click
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+from sqlalchemy import column, event, false, inspect, literal_column, or_, table, text
+
+from .models import db, Product
+
+FTS_TABLE = "product_fts"
+FTS_COLUMNS = (
+    "name_en", "name_ru", "name_tk",
+    "description_en", "description_ru", "description_tk",
+)
+# Веса колонок для bm25: совпадение в названии важнее совпадения в описании
+FTS_WEIGHTS = (10.0, 10.0, 10.0, 1.0, 1.0, 1.0)
+# unicode61 приводит к нижнему регистру и кириллицу, и латиницу;
+# remove_diacritics 2 позволяет найти "ýag" по запросу "yag" и "ёлка" по "елка"
+FTS_TOKENIZE = "unicode61 remove_diacritics 2"
+# Префиксные индексы ускоряют запросы вида "мол*"
+FTS_PREFIX = "2 3"
+
+_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+_token_re = re.compile(r"\w+", re.UNICODE)
+
+
+def init_search(app):
+    """Проверяет, создан ли FTS-индекс, и регистрирует CLI-команду.
+
+    Запуск воркеров и flask-команд ничего не пишет в базу: после создания
+    индекса воркеры нужно перезапустить, чтобы они начали его использовать.
+    """
+    with app.app_context():
+        enabled = _index_exists()
+        if not enabled and db.engine.dialect.name == "sqlite":
+            app.logger.info(
+                "Product search index is missing, falling back to ILIKE; "
+                "run `flask db upgrade` or `flask search-reindex`"
+            )
+        app.extensions["product_search"] = enabled
+    app.cli.add_command(search_reindex_command)
+
+
+def search_enabled():
+    if not has_app_context():
+        return False
+    return current_app.extensions.get("product_search", False)
+
+
+def build_match_query(search_query):
+    """Превращает пользовательский ввод в FTS5-выражение с префиксным поиском.
+
+    Каждое слово берется в кавычки (чтобы операторы FTS5 из ввода не
+    интерпретировались) и дополняется ``*``; слова объединяются через AND.
+    Если в строке нет ни одного слова, возвращается None:
+
+    >>> build_match_query("Молоко 3.2%")
+    '"молоко"* "3"* "2"*'
+    >>> build_match_query("!!!") is None
+    True
+    """
+    tokens = _token_re.findall((search_query or "").lower())
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def apply_product_search(query, search_query, ranked=True):
+    """Фильтрует запрос товаров по строке поиска.
+
+    При ``ranked=True`` результаты сортируются по релевантности (bm25).
+    """
+    if not search_enabled():
+        pattern = f"%{search_query}%"
+        return query.filter(or_(*[getattr(Product, name).ilike(pattern) for name in FTS_COLUMNS]))
+
+    match = build_match_query(search_query)
+    if match is None:
+        # Строка из одних знаков препинания ни с чем не совпадает (как и в ILIKE)
+        return query.filter(false())
+    query = (
+        query.join(_fts, _fts.c.rowid == Product.id)
+        .filter(literal_column(FTS_TABLE).op("MATCH")(match))
+    )
+    return query.order_by(_fts.c.rank) if ranked else query
+
+
+def _fill_statements():
+    columns = ", ".join(FTS_COLUMNS)
+    return [
+        f"INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {columns} FROM {Product.__tablename__}",
+        f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')",
+    ]
+
+
+def rebuild_index():
+    """Полностью пересобирает индекс по текущему содержимому таблицы product."""
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    for statement in _fill_statements():
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
+@click.command("search-reindex")
+@with_appcontext
+def search_reindex_command():
+    """Создать (если нужно) и пересобрать полнотекстовый индекс товаров."""
+    created = _ensure_index()
+    if created is None:
+        raise click.ClickException("FTS5 is not available for the configured database")
+    current_app.extensions["product_search"] = True
+    if not created:
+        rebuild_index()
+    count = db.session.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar()
+    click.echo(f"Indexed {count} products")
+
+
+def _index_exists():
+    return db.engine.dialect.name == "sqlite" and inspect(db.engine).has_table(FTS_TABLE)
+
+
+def _ensure_index():
+    """create_index() или None, если FTS5 недоступен."""
+    if db.engine.dialect.name != "sqlite":
+        return None
+    try:
+        return create_index()
+    except db.engine.dialect.dbapi.OperationalError as exc:
+        # "no such module: fts5"; остальные ошибки (блокировка, диск) — не повод отключать поиск
+        if "no such module" not in str(exc):
+            raise
+        return None
+
+
+def create_index():
+    """Создает и заполняет FTS-таблицу, если её нет. True — если её создал этот вызов.
+
+    Проверка и создание идут в одной транзакции BEGIN IMMEDIATE (pysqlite сам
+    выполняет DDL вне транзакции), поэтому из нескольких одновременных вызовов
+    ``flask search-reindex`` таблицу создает и заполняет ровно один, а остальные
+    ждут его коммита и видят готовую таблицу.
+    """
+    columns = ", ".join(FTS_COLUMNS)
+    weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,))
+            if cursor.fetchone():
+                connection.rollback()
+                return False
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{columns}, tokenize = '{FTS_TOKENIZE}', prefix = '{FTS_PREFIX}')"
+            )
+            # Ранжирование по умолчанию для скрытой колонки rank
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25({weights})')")
+            for statement in _fill_statements():
+                cursor.execute(statement)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        return True
+    finally:
+        connection.close()
+
+
+# -----------------------------
+# Синхронизация индекса с моделью Product
+# -----------------------------
+def _delete_row(connection, product_id):
+    connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": product_id})
+
+
+def _insert_row(connection, product):
+    columns = ", ".join(FTS_COLUMNS)
+    params = ", ".join(f":{name}" for name in FTS_COLUMNS)
+    values = {name: getattr(product, name) for name in FTS_COLUMNS}
+    values["id"] = product.id
+    connection.execute(text(f"INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (:id, {params})"), values)
+
+
+@event.listens_for(Product, "after_insert")
+def _product_inserted(mapper, connection, target):
+    if search_enabled():
+        _insert_row(connection, target)
+
+
+@event.listens_for(Product, "after_update")
+def _product_updated(mapper, connection, target):
+    if not search_enabled():
+        return
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in FTS_COLUMNS):
+        _delete_row(connection, target.id)
+        _insert_row(connection, target)
+
+
+@event.listens_for(Product, "after_delete")
+def _product_deleted(mapper, connection, target):
+    if search_enabled():
+        _delete_row(connection, target.id)
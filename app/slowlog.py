@@ -0,0 +1,190 @@
+"""Журнал медленных SQL-запросов.
+
+Запросы дольше ``SLOW_QUERY_THRESHOLD_MS`` пишутся в ротируемый файл
+``SLOW_QUERY_LOG`` по одному JSON-объекту на строку: SQL, параметры, эндпоинт,
+откуда пришел запрос, и план выполнения (``EXPLAIN QUERY PLAN`` для SQLite,
+``EXPLAIN`` для PostgreSQL), снятый тут же через DBAPI-курсор того же соединения.
+
+``flask slow-queries`` показывает самые дорогие запросы по суммарному времени.
+"""
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+import click
+from flask import current_app, has_request_context, request
+from flask.cli import with_appcontext
+from sqlalchemy import event
+
+from .models import db
+
+logger = logging.getLogger(__name__ + ".queries")
+
+MAX_PARAM_LENGTH = 200
+_EXPLAIN = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+_ws_re = re.compile(r"\s+")
+_in_list_re = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s)\s*,)+\s*(?:\?|%s|%\(\w+\)s)\s*\)")
+
+
+# -----------------------------
+# Запись
+# -----------------------------
+def _short(value):
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > MAX_PARAM_LENGTH:
+        return value[:MAX_PARAM_LENGTH] + "…"
+    return value
+
+
+def _plain_params(parameters, executemany):
+    if executemany:
+        return {"rows": len(parameters)}  # для пакетных вставок параметры не пишем
+    if isinstance(parameters, dict):
+        return {key: _short(value) for key, value in parameters.items()}
+    return [_short(value) for value in parameters or ()]
+
+
+def _explain(cursor, dialect, statement, parameters):
+    prefix = _EXPLAIN.get(dialect)
+    if prefix is None or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(prefix + statement, parameters)
+        rows = explain_cursor.fetchall()
+    except Exception as exc:  # план — вспомогательная информация, запрос уже выполнен
+        return f"EXPLAIN failed: {exc}"
+    finally:
+        explain_cursor.close()
+    # SQLite: (id, parent, notused, detail); PostgreSQL: одна колонка с текстом
+    return [row[-1] for row in rows]
+
+
+def _origin():
+    if not has_request_context():
+        return {"endpoint": None}
+    return {"endpoint": request.endpoint, "method": request.method, "path": request.full_path.rstrip("?")}
+
+
+def _listen(engine, threshold, capture_plan):
+    dialect = engine.dialect.name
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started", None)
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        if duration < threshold:
+            return
+        entry = {
+            "ts": datetime.utcnow().isoformat(timespec="milliseconds") + "Z",
+            "duration_ms": round(duration * 1000, 2),
+            "sql": statement,
+            "params": _plain_params(parameters, executemany),
+            **_origin(),
+            "pid": os.getpid(),
+        }
+        if capture_plan and not executemany:
+            entry["plan"] = _explain(cursor, dialect, statement, parameters)
+        logger.warning(json.dumps(entry, ensure_ascii=False, default=str))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+# -----------------------------
+# Сводка
+# -----------------------------
+def normalize_sql(statement):
+    """SQL без различий в пробелах и длине списков IN (...)."""
+    return _in_list_re.sub("(?, ...)", _ws_re.sub(" ", statement).strip())
+
+
+def read_entries(path, backups):
+    """Записи из текущего файла журнала и его ротированных копий."""
+    for name in [f"{path}.{i}" for i in range(backups, 0, -1)] + [path]:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # строка, оборванная при падении процесса
+
+
+def summarize(entries):
+    groups = {}
+    for entry in entries:
+        group = groups.setdefault(normalize_sql(entry["sql"]), {
+            "count": 0, "total_ms": 0.0, "max_ms": 0.0, "endpoints": {}, "plan": None,
+        })
+        group["count"] += 1
+        group["total_ms"] += entry["duration_ms"]
+        group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+        endpoint = entry.get("endpoint") or "-"
+        group["endpoints"][endpoint] = group["endpoints"].get(endpoint, 0) + 1
+        group["plan"] = entry.get("plan") or group["plan"]
+    return sorted(groups.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+
+
+@click.command("slow-queries")
+@click.option("--top", default=10, show_default=True, help="Сколько запросов показать.")
+@click.option("--plan/--no-plan", default=True, help="Печатать план выполнения.")
+@with_appcontext
+def slow_queries_command(top, plan):
+    """Самые дорогие запросы из журнала медленных запросов."""
+    path = current_app.config["SLOW_QUERY_LOG"]
+    summary = summarize(read_entries(path, current_app.config["SLOW_QUERY_LOG_BACKUPS"]))
+    if not summary:
+        click.echo(f"No slow queries in {path}")
+        return
+    for rank, (sql, group) in enumerate(summary[:top], 1):
+        endpoints = ", ".join(
+            f"{name} ({n})" for name, n in sorted(group["endpoints"].items(), key=lambda item: -item[1])
+        )
+        click.echo(
+            f"#{rank} total {group['total_ms']:.1f} ms, {group['count']} calls, "
+            f"avg {group['total_ms'] / group['count']:.1f} ms, max {group['max_ms']:.1f} ms"
+        )
+        click.echo(f"   endpoints: {endpoints}")
+        click.echo(f"   {sql}")
+        if plan and group["plan"]:
+            for line in group["plan"] if isinstance(group["plan"], list) else [group["plan"]]:
+                click.echo(f"      {line}")
+        click.echo()
+
+
+def init_slow_query_log(app):
+    """Вызывается после init_database: журнал подключается и к движку только для чтения."""
+    app.cli.add_command(slow_queries_command)
+    threshold = app.config["SLOW_QUERY_THRESHOLD_MS"]
+    if threshold is None:
+        return
+    path = app.config["SLOW_QUERY_LOG"]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if not logger.handlers:
+        handler = RotatingFileHandler(
+            path, maxBytes=app.config["SLOW_QUERY_LOG_MAX_BYTES"],
+            backupCount=app.config["SLOW_QUERY_LOG_BACKUPS"], encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.WARNING)
+        logger.propagate = False  # JSON-строки не дублируются в общий лог
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    if app.extensions.get("read_engine") is not None:
+        engines.append(app.extensions["read_engine"])
+    for engine in engines:
+        _listen(engine, threshold / 1000, app.config["SLOW_QUERY_EXPLAIN"])
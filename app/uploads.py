@@ -0,0 +1,165 @@
+"""Загрузка файлов под именами из хэша содержимого.
+
+Файл сохраняется как ``static/uploads/<папка>/<хэш>.<расширение>``: одинаковые
+файлы не дублируются, а новый контент всегда получает новый URL. Поэтому такие
+файлы отдаются с ``Cache-Control: immutable`` и сроком в год — браузеры и
+прокси не перезапрашивают их, пока ссылка в базе не изменится.
+"""
+import hashlib
+import os
+import re
+import shutil
+
+import click
+from flask import current_app, request, url_for
+from flask.cli import with_appcontext
+from flask_admin.form import ImageUploadField
+from flask_admin.form.upload import ImageUploadInput
+from werkzeug.utils import secure_filename
+
+from .images import model_image_paths, schedule_variants
+from .models import db
+
+UPLOADS_PREFIX = "static/uploads"
+HASH_LENGTH = 20
+# <хэш>.<ext> и уменьшенные копии из app/images.py: _variants/<хэш>-<ширина>w.<ext>
+_fingerprinted_re = re.compile(rf"/[0-9a-f]{{{HASH_LENGTH}}}(-\d+w)?\.\w+$")
+
+
+def content_hash(stream):
+    """Хэш содержимого файла; позиция в потоке возвращается в начало."""
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(64 * 1024), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_filename(file_data):
+    ext = os.path.splitext(secure_filename(file_data.filename or ""))[1].lower()
+    return f"{content_hash(file_data.stream)}{ext}"
+
+
+def is_fingerprinted(path):
+    return bool(path) and _fingerprinted_re.search(path) is not None
+
+
+def upload_dir(folder):
+    return os.path.join(current_app.config["UPLOAD_FOLDER"], folder)
+
+
+def save_upload(file_data, folder):
+    """Сохраняет FileStorage и возвращает путь для колонки модели."""
+    filename = hashed_filename(file_data)
+    directory = upload_dir(folder)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, filename)
+    if not os.path.exists(path):
+        file_data.save(path)
+    return f"{UPLOADS_PREFIX}/{folder}/{filename}"
+
+
+# -----------------------------
+# Поле админки
+# -----------------------------
+class _HashedImageUploadInput(ImageUploadInput):
+    def get_url(self, field):
+        filename = field.data or ""
+        if filename.startswith("static/"):
+            filename = filename[len("static/"):]
+        return url_for(field.endpoint, filename=filename)
+
+
+class HashedImageUploadField(ImageUploadField):
+    """ImageUploadField, который хранит в модели полный путь ``static/uploads/...``.
+
+    Старый файл при замене не удаляется: под тем же хэшем на него могут
+    ссылаться другие записи.
+    """
+    widget = _HashedImageUploadInput()
+
+    def __init__(self, label=None, folder=None, **kwargs):
+        self.folder = folder
+        kwargs.setdefault("namegen", lambda obj, file_data: hashed_filename(file_data))
+        super().__init__(label, base_path=lambda: upload_dir(folder), **kwargs)
+
+    def populate_obj(self, obj, name):
+        if self._should_delete:
+            setattr(obj, name, None)
+        elif self._is_uploaded_file(self.data):
+            filename = self._save_file(self.data, self.generate_name(obj, self.data))
+            self.data.filename = filename
+            setattr(obj, name, f"{UPLOADS_PREFIX}/{self.folder}/{filename}")
+
+    def _save_file(self, data, filename):
+        # Формат может смениться на JPEG — проверяем итоговое имя
+        target, _ = self._get_save_format(filename, self.image)
+        if os.path.exists(self._get_path(target)):
+            return target
+        return super()._save_file(data, filename)
+
+
+# -----------------------------
+# Заголовки кэширования
+# -----------------------------
+def _immutable_cache_headers(response):
+    if request.endpoint == "static" and response.status_code in (200, 304) and is_fingerprinted(request.path):
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config["UPLOADS_MAX_AGE"]
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    return response
+
+
+# -----------------------------
+# Перевод уже загруженных файлов на хэш-имена
+# -----------------------------
+def _fingerprint_path(path):
+    """Копирует файл под хэш-именем и возвращает новый путь (или старый)."""
+    if not path or is_fingerprinted(path) or not path.startswith(UPLOADS_PREFIX + "/"):
+        return path
+    source = os.path.join(current_app.config["UPLOAD_FOLDER"], path[len(UPLOADS_PREFIX) + 1:])
+    if not os.path.isfile(source):
+        return path
+    with open(source, "rb") as fh:
+        digest = content_hash(fh)
+    directory, filename = os.path.split(source)
+    new_name = f"{digest}{os.path.splitext(filename)[1].lower()}"
+    target = os.path.join(directory, new_name)
+    if not os.path.exists(target):
+        shutil.copy2(source, target)
+    return f"{os.path.dirname(path)}/{new_name}"
+
+
+@click.command("uploads-fingerprint")
+@with_appcontext
+def uploads_fingerprint_command():
+    """Перевести ранее загруженные файлы на хэш-имена и обновить ссылки в базе.
+
+    Исходные файлы остаются на месте, чтобы не сломать внешние ссылки на них.
+    """
+    models = [m.class_ for m in db.Model.registry.mappers if getattr(m.class_, "url_fields", ())]
+    updated = 0
+    for model in models:
+        for obj in model.query:
+            for name in model.url_fields:
+                value = getattr(obj, name)
+                if isinstance(value, list):
+                    new = [_fingerprint_path(path) for path in value]
+                else:
+                    new = _fingerprint_path(value)
+                if new != value:
+                    setattr(obj, name, new)
+                    updated += 1
+    db.session.commit()
+    click.echo(f"Updated {updated} image references")
+
+    # Уменьшенные копии для новых имен
+    for model in models:
+        schedule_variants([path for obj in model.query for path in model_image_paths(obj)], model.__tablename__)
+
+
+def init_uploads(app):
+    app.after_request(_immutable_cache_headers)
+    app.cli.add_command(uploads_fingerprint_command)
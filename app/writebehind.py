@@ -0,0 +1,240 @@
+"""Отложенная запись сообщений и подписок (write-behind).
+
+POST-эндпоинты не пишут в базу сами: запись кладется в ограниченную очередь
+процесса, а фоновый поток собирает пачку и вставляет её одной транзакцией.
+Так при всплеске запросов SQLite видит одного писателя с редкими коммитами
+вместо множества конкурирующих, и чтения не ждут блокировок. Клиент сразу
+получает 202 без какого-либо идентификатора: ответ означает «принято в очередь»,
+а не «записано», и узнать судьбу отдельной записи нельзя. При остановке процесса
+очередь дописывается; строки, которые не удалось записать (ошибка вставки или
+не успели до таймаута остановки), видны только в /metrics и журнале.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import db, ContactMessage, NewsletterSubscriber
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class QueueFull(Exception):
+    pass
+
+
+class WriteBehindQueue:
+    def __init__(self, app, maxsize, batch_size, max_delay, shutdown_timeout):
+        self.app = app
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.shutdown_timeout = shutdown_timeout
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        # Метрики
+        self.enqueued = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.lost = 0  # не дописаны при остановке процесса
+        self.batches = 0
+        self.latency_total = 0.0  # сумма секунд от постановки в очередь до коммита
+
+    def submit(self, model, values):
+        """Ставит строку в очередь (QueueFull, если она переполнена)."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((model, values, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise QueueFull() from None
+        with self._lock:
+            self.enqueued += 1
+
+    def metrics(self):
+        """Счетчики и текущие значения для /metrics (см. app/metrics.py)."""
+        with self._lock:
+            counters = {
+                "write_behind_enqueued_total": self.enqueued,
+                "write_behind_rejected_total": self.rejected,
+                "write_behind_written_total": self.written,
+                "write_behind_failed_total": self.failed,
+                "write_behind_lost_total": self.lost,
+                "write_behind_batches_total": self.batches,
+                "write_behind_latency_seconds_total": self.latency_total,
+            }
+        gauges = {
+            "write_behind_queue_depth": self._queue.qsize(),
+            "write_behind_queue_capacity": self._queue.maxsize,
+        }
+        return counters, gauges
+
+    def flush(self, timeout=None):
+        """Ждет, пока все поставленные в очередь записи будут обработаны."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self):
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(self.shutdown_timeout)
+        if thread.is_alive():
+            lost = self._queue.qsize()
+            with self._lock:
+                self.lost += lost
+            logger.error("Write-behind queue not drained on shutdown, %s rows lost", lost)
+
+    # -----------------------------
+    # Поток записи
+    # -----------------------------
+    def _ensure_started(self):
+        # Поток запускается лениво: после fork (gunicorn) в дочернем процессе его нет
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue(self._queue.maxsize) if self._pid else self._queue
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True  # допишем текущую пачку и выйдем
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        with self.app.app_context():
+            try:
+                _insert_batch(batch)
+                db.session.commit()
+                written, failed = len(batch), 0
+            except Exception:
+                db.session.rollback()
+                logger.exception("Write-behind batch of %s rows failed, retrying row by row", len(batch))
+                written, failed = self._write_rows(batch)
+            finally:
+                db.session.remove()
+        now = time.monotonic()
+        with self._lock:
+            self.batches += 1
+            self.written += written
+            self.failed += failed
+            self.latency_total += sum(now - queued_at for _, _, queued_at in batch)
+
+    def _write_rows(self, batch):
+        written = failed = 0
+        for item in batch:
+            try:
+                _insert_batch([item])
+                db.session.commit()
+                written += 1
+            except Exception:
+                db.session.rollback()
+                logger.exception("Write-behind row dropped: %s", item[1])
+                failed += 1
+        return written, failed
+
+
+def _insert_batch(batch):
+    rows = {}
+    for model, values, _ in batch:
+        rows.setdefault(model, []).append(values)
+    for model, values in rows.items():
+        if model is NewsletterSubscriber:
+            upsert_subscribers(values)
+        else:
+            db.session.execute(insert(model), values)
+
+
+def upsert_subscribers(rows):
+    """Вставка подписчиков без ошибок на уже существующих email.
+
+    Возвращает число действительно добавленных строк.
+    """
+    table = NewsletterSubscriber.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        module = sqlite if dialect == "sqlite" else postgresql
+        stmt = module.insert(table).on_conflict_do_nothing(index_elements=["email"])
+        return db.session.execute(stmt, rows).rowcount
+    emails = {row["email"] for row in rows}
+    existing = set(db.session.scalars(db.select(table.c.email).where(table.c.email.in_(emails))))
+    fresh = {}
+    for row in rows:
+        if row["email"] not in existing:
+            fresh.setdefault(row["email"], row)
+    if fresh:
+        db.session.execute(insert(table), list(fresh.values()))
+    return len(fresh)
+
+
+# -----------------------------
+# Публичный интерфейс
+# -----------------------------
+def write_behind_enabled():
+    return current_app.extensions.get("write_behind") is not None
+
+
+def submit_contact_message(name, email, message):
+    current_app.extensions["write_behind"].submit(ContactMessage, {
+        "name": name, "email": email, "message": message, "submission_date": datetime.utcnow(),
+    })
+
+
+def submit_newsletter_subscriber(email):
+    current_app.extensions["write_behind"].submit(NewsletterSubscriber, {
+        "email": email, "subscription_date": datetime.utcnow(),
+    })
+
+
+def init_write_behind(app):
+    if not app.config["WRITE_BEHIND_ENABLED"]:
+        app.extensions["write_behind"] = None
+        return
+    app.extensions["write_behind"] = WriteBehindQueue(
+        app,
+        maxsize=app.config["WRITE_BEHIND_QUEUE_SIZE"],
+        batch_size=app.config["WRITE_BEHIND_BATCH_SIZE"],
+        max_delay=app.config["WRITE_BEHIND_MAX_DELAY"],
+        shutdown_timeout=app.config["WRITE_BEHIND_SHUTDOWN_TIMEOUT"],
+    )
@@ -0,0 +1,151 @@
+"""Генератор синтетического каталога для бенчмарков.
+
+Создает в SQLite-файле правдоподобный трехъязычный каталог заданного
+размера: компании, бренды, дерево категорий глубиной до ``--depth`` уровней,
+товары, новости за несколько лет, баннеры и сертификаты. Строки вставляются
+пачками через Core ``INSERT`` (без ORM), после чего пересобирается
+полнотекстовый индекс товаров.
+
+Запуск из корня проекта:
+    python -m benchmarks.catalog --products 100000 --categories 5000 --news 20000 -o /tmp/catalog.db
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from .compression import WORDS, _text
+
+CHUNK_SIZE = 5000
+SCALE = {"products": 100_000, "categories": 5000, "news": 20_000, "brands": 200, "companies": 3}
+
+
+def make_app(db_url, **overrides):
+    """Приложение для бенчмарка с базой ``db_url`` (конфиг читает DATABASE_URL при импорте)."""
+    os.environ["DATABASE_URL"] = db_url
+    from app import create_app
+    from app.config import Config
+
+    attrs = {"SQLALCHEMY_DATABASE_URI": db_url, **overrides}
+    return create_app(type("BenchConfig", (Config,), attrs))
+
+
+def _names(rng, field, words):
+    return {f"{field}_{lang}": _text(rng, lang, words) for lang in WORDS}
+
+
+def _insert(db, model, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(insert(model), rows[start:start + CHUNK_SIZE])
+
+
+def _category_rows(rng, count, depth):
+    """Дерево категорий: около 2% корней, остальные подвешены к случайному узлу
+    не глубже ``depth - 1``, поэтому у верхних уровней много потомков."""
+    roots = max(1, count // 50)
+    levels = {}
+    parents = []  # узлы, к которым еще можно подвесить потомка
+    rows = []
+    for i in range(1, count + 1):
+        parent = rng.choice(parents) if i > roots else None
+        levels[i] = levels[parent] + 1 if parent else 0
+        if levels[i] < depth - 1:
+            parents.append(i)
+        rows.append({
+            "id": i, "slug": f"category-{i}", "parent_category_id": parent,
+            "image": f"static/uploads/categories/{i}.png",
+            **_names(rng, "name", 2), **_names(rng, "description", 20),
+        })
+    return rows
+
+
+def generate(db, models, products, categories, news, brands, companies, depth=6, seed=42):
+    """Заполняет пустую базу; возвращает число строк по таблицам."""
+    rng = random.Random(seed)
+    _insert(db, models.Company, [
+        {"id": i, "phone": f"+993 12 {i:06d}", "email": f"info{i}@example.com",
+         **_names(rng, "name", 2), **_names(rng, "mission", 40), **_names(rng, "vision", 40),
+         **_names(rng, "address", 5)}
+        for i in range(1, companies + 1)
+    ])
+    _insert(db, models.Brand, [
+        {"id": i, "slug": f"brand-{i}", "company_id": rng.randint(1, companies),
+         "logo_image": f"static/uploads/brands/{i}.png",
+         **_names(rng, "name", 1), **_names(rng, "subtitle", 4), **_names(rng, "description", 40)}
+        for i in range(1, brands + 1)
+    ])
+    # Вставка по уровням не нужна: SQLite не проверяет внешние ключи без PRAGMA foreign_keys
+    _insert(db, models.ProductCategory, _category_rows(rng, categories, depth))
+    leaf_ids = list(range(max(1, categories // 50) + 1, categories + 1)) or [1]
+    for start in range(1, products + 1, CHUNK_SIZE):
+        _insert(db, models.Product, [
+            {"id": i, "slug": f"product-{i}", "category_id": rng.choice(leaf_ids),
+             "brand_id": rng.randint(1, brands), "volume_or_weight": f"{rng.choice((250, 500, 1000))} g",
+             "image": f"static/uploads/products/{i}.png",
+             "additional_images": [f"static/uploads/products/{i}-{n}.png" for n in range(rng.randint(0, 3))],
+             **_names(rng, "name", 3), **_names(rng, "description", 40), **_names(rng, "packaging_details", 10)}
+            for i in range(start, min(start + CHUNK_SIZE, products + 1))
+        ])
+    first_day = date.today() - timedelta(days=5 * 365)
+    for start in range(1, news + 1, CHUNK_SIZE):
+        _insert(db, models.News, [
+            {"id": i, "slug": f"news-{i}", "company_id": rng.randint(1, companies),
+             "publication_date": first_day + timedelta(days=rng.randrange(5 * 365)),
+             "image": f"static/uploads/news/{i}.png", "reading_minutes": rng.randint(1, 15),
+             **_names(rng, "title", 6), **_names(rng, "subtitle", 10), **_names(rng, "body_text", 150)}
+            for i in range(start, min(start + CHUNK_SIZE, news + 1))
+        ])
+    _insert(db, models.Banner, [
+        {"id": i, "slug": f"banner-{i}", "image": f"static/uploads/banners/{i}.png", "link": f"/products/{i}"}
+        for i in range(1, 11)
+    ])
+    _insert(db, models.Certificate, [
+        {"id": i, "slug": f"certificate-{i}", "image": f"static/uploads/certificates/{i}.png"}
+        for i in range(1, 21)
+    ])
+    db.session.commit()
+    return {"companies": companies, "brands": brands, "categories": categories, "products": products, "news": news}
+
+
+def build(path, products, categories, news, brands, companies, depth=6):
+    """Создает базу каталога в файле ``path`` (файл перезаписывается)."""
+    if os.path.exists(path):
+        os.remove(path)
+    app = make_app(f"sqlite:///{path}", RESPONSE_CACHE_ENABLED=False, WRITE_BEHIND_ENABLED=False)
+    from app import models
+    from app.search import create_index
+
+    with app.app_context():
+        counts = generate(models.db, models, products, categories, news, brands, companies, depth)
+        # Индекс поиска создается после вставки (Core INSERT не вызывает события маппера),
+        # как это делают миграция и `flask search-reindex`
+        create_index()
+        models.db.engine.dispose()
+    return counts
+
+
+def add_scale_arguments(parser):
+    for name, default in SCALE.items():
+        parser.add_argument(f"--{name}", type=int, default=default)
+    parser.add_argument("--depth", type=int, default=6, help="Максимальная глубина дерева категорий.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_scale_arguments(parser)
+    parser.add_argument("--output", "-o", help="Файл базы (по умолчанию во временном каталоге).")
+    args = parser.parse_args()
+
+    path = args.output or os.path.join(tempfile.mkdtemp(prefix="bench-catalog-"), "catalog.db")
+    started = time.perf_counter()
+    counts = build(path, args.products, args.categories, args.news, args.brands, args.companies, args.depth)
+    summary = ", ".join(f"{n} {table}" for table, n in counts.items())
+    print(f"{path}: {summary} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
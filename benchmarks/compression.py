@@ -0,0 +1,98 @@
+"""Бенчмарк сжатия ответов API: байты на ответ и CPU на запрос.
+
+Сравнивает отдачу без сжатия, сжатие на каждый запрос и отдачу заранее
+сжатых байтов из кэша ответов. База создается во временном каталоге.
+
+Запуск из корня проекта:
+    python -m benchmarks.compression --products 2000 --requests 200
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+WORDS = {
+    "en": "fresh natural quality product taste milk juice water family healthy choice".split(),
+    "ru": "свежий натуральный качественный продукт вкус молоко сок вода семья полезный выбор".split(),
+    "tk": "täze tebigy hilli önüm tagam süýt şire suw maşgala peýdaly saýlaw".split(),
+}
+
+ENDPOINTS = ("/api/products?limit=100", "/api/news?limit=50")
+
+
+def _text(rng, lang, words):
+    return " ".join(rng.choice(WORDS[lang]) for _ in range(words)).capitalize()
+
+
+def seed(db, models, products, news):
+    rng = random.Random(42)
+    company = models.Company(name_en="Company", name_ru="Компания", name_tk="Kompaniýa")
+    db.session.add(company)
+    db.session.flush()
+    brand = models.Brand(name_en="Brand", name_ru="Бренд", name_tk="Brend", slug="brand", company_id=company.id)
+    category = models.ProductCategory(name_en="Category", name_ru="Категория", name_tk="Kategoriýa", slug="category")
+    db.session.add_all([brand, category])
+    db.session.flush()
+    for i in range(products):
+        db.session.add(models.Product(
+            slug=f"product-{i}", category_id=category.id, brand_id=brand.id,
+            image=f"static/uploads/products/{i}.png",
+            **{f"name_{lang}": _text(rng, lang, 3) for lang in WORDS},
+            **{f"description_{lang}": _text(rng, lang, 60) for lang in WORDS},
+            **{f"packaging_details_{lang}": _text(rng, lang, 15) for lang in WORDS},
+        ))
+    for i in range(news):
+        db.session.add(models.News(
+            slug=f"news-{i}", company_id=company.id,
+            **{f"title_{lang}": _text(rng, lang, 6) for lang in WORDS},
+            **{f"body_text_{lang}": _text(rng, lang, 200) for lang in WORDS},
+        ))
+    db.session.commit()
+
+
+def measure(client, path, encoding, requests):
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    response = client.get(path, headers=headers)  # прогрев кэша
+    started = time.process_time()
+    for _ in range(requests):
+        client.get(path, headers=headers)
+    cpu_ms = (time.process_time() - started) * 1000 / requests
+    return len(response.data), cpu_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--news", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-compression-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    from app import create_app, models
+    from app.compression import available_encodings
+
+    app = create_app()
+    with app.app_context():
+        seed(models.db, models, args.products, args.news)
+    client = app.test_client()
+    cache = app.extensions["response_cache"]
+
+    scenarios = [("identity, no cache", None, False, False)]
+    for encoding in reversed(available_encodings()):
+        scenarios.append((f"{encoding}, compress per request", encoding, True, False))
+        scenarios.append((f"{encoding}, cached compressed", encoding, True, True))
+
+    print(f"{'endpoint':<28} {'scenario':<32} {'bytes':>10} {'cpu ms/req':>11}")
+    for path in ENDPOINTS:
+        for name, encoding, compress, use_cache in scenarios:
+            app.config["COMPRESSION_ENABLED"] = compress
+            app.config["RESPONSE_CACHE_ENABLED"] = use_cache
+            cache.clear()
+            size, cpu_ms = measure(client, path, encoding, args.requests)
+            print(f"{path:<28} {name:<32} {size:>10} {cpu_ms:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
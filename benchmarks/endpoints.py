@@ -0,0 +1,321 @@
+"""Бенчмарк всех эндпоинтов API на большом синтетическом каталоге.
+
+Каталог генерируется benchmarks.catalog во временный SQLite-файл (или берется
+готовый через ``--db``). Каждый маршрут ``api_bp`` прогоняется двумя способами:
+
+* ``client`` — последовательно через Flask test client (без сети);
+* ``wsgi`` — многопоточная нагрузка на werkzeug-сервер в этом же процессе.
+
+Для каждого маршрута печатаются p50/p95/p99 задержки, запросов в секунду,
+SQL-запросов на запрос и байт в ответе. С ``--json`` результаты пишутся в файл,
+который удобно сравнивать между коммитами. Кэш ответов по умолчанию выключен,
+чтобы измерять работу с базой (``--cache`` включает его).
+
+Запуск из корня проекта:
+    python -m benchmarks.endpoints --products 100000 --categories 5000 --news 20000 --json bench.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from itertools import count
+from urllib.parse import quote
+
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+from werkzeug.serving import make_server
+
+from .catalog import add_scale_arguments, build, make_app
+
+_local = threading.local()
+_emails = count()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_queries(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, "queries", None) is not None:
+        _local.queries += 1
+
+
+class QueryCounter:
+    """WSGI-обертка: считает SQL-запросы каждого запроса, включая потоковые ответы."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        _local.queries = 0
+        try:
+            body = list(self.wsgi_app(environ, start_response))
+            key = (environ["REQUEST_METHOD"], environ["PATH_INFO"], environ.get("QUERY_STRING", ""))
+            with self._lock:
+                self.counts.setdefault(key, []).append(_local.queries)
+        finally:
+            _local.queries = None
+        return body
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+
+# -----------------------------
+# Маршруты
+# -----------------------------
+def scenarios(app):
+    """(название, метод, путь, тело) для каждого маршрута api_bp на данных каталога."""
+    from app import models
+    from app.categories import category_tree
+
+    db = models.db
+    with app.app_context():
+        middle = db.session.scalar(select(func.max(models.Product.id))) // 2
+        product_slug = db.session.scalar(select(models.Product.slug).where(models.Product.id == middle))
+        news_id = db.session.scalar(select(func.max(models.News.id))) // 2
+        news_slug = db.session.scalar(select(models.News.slug).where(models.News.id == news_id))
+        tree = category_tree()
+        # Корень с самым большим поддеревом — самый тяжелый фильтр по категории
+        root = max(tree.roots(), key=lambda cid: len(tree.descendant_ids(cid)))
+        root_slug = db.session.scalar(select(models.ProductCategory.slug).where(models.ProductCategory.id == root))
+        word = db.session.scalar(select(models.Product.name_ru).where(models.Product.id == middle)).split()[0]
+
+    ids = ",".join(str(middle + i) for i in range(20))
+    return [
+        ("companies", "GET", "/api/companies", None),
+        ("company", "GET", "/api/companies/1", None),
+        ("certificates", "GET", "/api/certificates", None),
+        ("certificate", "GET", "/api/certificates/1", None),
+        ("certificate by slug", "GET", "/api/certificates/certificate-1", None),
+        ("brands", "GET", "/api/brands", None),
+        ("brand", "GET", "/api/brands/1", None),
+        ("brand by slug", "GET", "/api/brands/brand-1", None),
+        ("categories", "GET", "/api/categories", None),
+        ("categories parents", "GET", "/api/categories/parents", None),
+        ("categories tree", "GET", "/api/categories/tree", None),
+        ("category", "GET", f"/api/categories/{root}", None),
+        ("products page 1", "GET", "/api/products?limit=20", None),
+        ("products deep page", "GET", "/api/products?limit=20&page=500", None),
+        ("products cursor", "GET", "/api/products?limit=20&cursor=", None),
+        ("products by category", "GET", f"/api/products?category_id={root}&limit=20", None),
+        ("products by category slug", "GET", f"/api/products?category={root_slug}&limit=20", None),
+        ("products search", "GET", f"/api/products?q={quote(word)}&limit=20", None),
+        ("products ids", "GET", f"/api/products?ids={ids}", None),
+        ("product", "GET", f"/api/products/{middle}", None),
+        ("product by slug", "GET", f"/api/products/{product_slug}", None),
+        ("product recommendations", "GET", f"/api/products/recommendations/{middle}?related=1&seed=1", None),
+        ("products export", "GET", f"/api/products/export?after_id={max(middle * 2 - 1000, 0)}", None),
+        ("news page 1", "GET", "/api/news?limit=20", None),
+        ("news deep page", "GET", "/api/news?limit=20&page=200", None),
+        ("news cursor", "GET", "/api/news?limit=20&cursor=", None),
+        ("news item", "GET", f"/api/news/{news_id}", None),
+        ("news by slug", "GET", f"/api/news/{news_slug}", None),
+        ("news recommendations", "GET", f"/api/news/recommendations/{news_id}?seed=1", None),
+        ("news export", "GET", f"/api/news/export?after_id={max(news_id * 2 - 1000, 0)}", None),
+        ("banners", "GET", "/api/banners", None),
+        ("banner", "GET", "/api/banners/1", None),
+        ("banner by slug", "GET", "/api/banners/banner-1", None),
+        ("home", "GET", "/api/home", None),
+        ("batch", "POST", "/api/batch", {"requests": ["/products?limit=5", "/news?limit=5", "/brands"]}),
+        ("contact message", "POST", "/api/contact_messages",
+         {"name": "Bench", "email": "bench@example.com", "message": "Benchmark message"}),
+        ("newsletter subscriber", "POST", "/api/newsletter_subscribers", {"email": "bench-{n}@example.com"}),
+    ]
+
+
+def check_coverage(app, routes):
+    """Маршруты api_bp, для которых нет сценария (новый эндпоинт — добавьте его в scenarios)."""
+    adapter = app.url_map.bind("localhost")
+    covered = {adapter.match(path.split("?")[0], method=method)[0] for _, method, path, _ in routes}
+    api_endpoints = {rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint.startswith("api.")}
+    return sorted(api_endpoints - covered)
+
+
+def _body(body):
+    if body is None:
+        return None
+    # Каждому новому подписчику — свой email, иначе все запросы кроме первого будут дублями
+    return json.dumps(body).replace("{n}", str(next(_emails)))
+
+
+# -----------------------------
+# Режимы нагрузки
+# -----------------------------
+def run_client(app, counter, routes, requests, warmup):
+    client = app.test_client()
+    results = {}
+    for name, method, path, body in routes:
+        for _ in range(warmup):
+            client.open(path, method=method, data=_body(body), content_type="application/json")
+        counter.reset()
+        latencies, sizes, statuses = [], [], set()
+        started = time.perf_counter()
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            response = client.open(path, method=method, data=_body(body), content_type="application/json")
+            data = response.get_data()
+            latencies.append(time.perf_counter() - t0)
+            sizes.append(len(data))
+            statuses.add(response.status_code)
+        elapsed = time.perf_counter() - started
+        results[name] = _summary(latencies, sizes, statuses, elapsed, _queries(counter))
+    return results
+
+
+def run_wsgi(app, counter, routes, requests, threads):
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # без строки лога на каждый запрос
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    results = {}
+    try:
+        for name, method, path, body in routes:
+            counter.reset()
+            latencies, sizes, statuses = [], [], set()
+            errors = []
+            lock = threading.Lock()
+            per_thread = max(1, requests // threads)
+
+            def worker():
+                connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=60)
+                try:
+                    for _ in range(per_thread):
+                        t0 = time.perf_counter()
+                        connection.request(method, path, body=_body(body), headers={"Content-Type": "application/json"})
+                        response = connection.getresponse()
+                        data = response.read()
+                        latency = time.perf_counter() - t0
+                        with lock:
+                            latencies.append(latency)
+                            sizes.append(len(data))
+                            statuses.add(response.status)
+                        if response.getheader("Connection", "").lower() == "close" or response.version == 10:
+                            connection.close()
+                except (OSError, http.client.HTTPException) as exc:
+                    with lock:
+                        errors.append(exc)
+                finally:
+                    connection.close()
+
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            started = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            if errors:
+                print(f"{name}: {len(errors)} client errors, first: {errors[0]!r}")
+            results[name] = _summary(latencies, sizes, statuses, elapsed, _queries(counter))
+    finally:
+        server.shutdown()
+    return results
+
+
+def _queries(counter):
+    values = [n for counts in counter.counts.values() for n in counts]
+    return sum(values) / len(values) if values else 0.0
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000 if values else 0.0
+
+
+def _summary(latencies, sizes, statuses, elapsed, queries):
+    return {
+        "requests": len(latencies),
+        "status": sorted(statuses),
+        "p50_ms": round(_percentile(latencies, 0.50), 3),
+        "p95_ms": round(_percentile(latencies, 0.95), 3),
+        "p99_ms": round(_percentile(latencies, 0.99), 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "queries_per_request": round(queries, 2),
+        "bytes_per_response": round(sum(sizes) / len(sizes)) if sizes else 0,
+    }
+
+
+def _print(mode, results):
+    print(f"\n[{mode}]")
+    print(f"{'route':<28} {'status':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'queries':>8} {'bytes':>10}")
+    for name, r in results.items():
+        status = ",".join(map(str, r["status"]))
+        print(
+            f"{name:<28} {status:>7} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+            f"{r['rps']:>9.1f} {r['queries_per_request']:>8.2f} {r['bytes_per_response']:>10}"
+        )
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_scale_arguments(parser)
+    parser.add_argument("--db", help="Готовая база каталога (не перегенерируется, если файл существует).")
+    parser.add_argument("--requests", type=int, default=100, help="Запросов на маршрут в каждом режиме.")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=8, help="Потоков-клиентов в режиме wsgi.")
+    parser.add_argument("--mode", choices=("client", "wsgi", "both"), default="both")
+    parser.add_argument("--only", help="Запускать только маршруты, в названии которых есть эта строка.")
+    parser.add_argument("--cache", action="store_true", help="Включить кэш ответов.")
+    parser.add_argument("--json", dest="json_path", help="Записать результаты в JSON-файл.")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="bench-endpoints-"), "catalog.db")
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        build(path, args.products, args.categories, args.news, args.brands, args.companies, args.depth)
+        print(f"Catalog generated in {time.perf_counter() - started:.1f}s: {path}")
+
+    app = make_app(f"sqlite:///{path}", RESPONSE_CACHE_ENABLED=args.cache)
+    counter = QueryCounter(app.wsgi_app)
+    app.wsgi_app = counter
+    routes = scenarios(app)
+    missing = check_coverage(app, routes)
+    if missing:
+        print(f"Warning: no scenario for {', '.join(missing)}")
+    if args.only:
+        routes = [route for route in routes if args.only in route[0]]
+
+    report = {
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "catalog": {"path": path, "products": args.products, "categories": args.categories, "news": args.news},
+        "settings": {"requests": args.requests, "threads": args.threads, "cache": args.cache},
+        "results": {},
+    }
+    for mode in ("client", "wsgi") if args.mode == "both" else (args.mode,):
+        if mode == "client":
+            results = run_client(app, counter, routes, args.requests, args.warmup)
+        else:
+            results = run_wsgi(app, counter, routes, args.requests, args.threads)
+        report["results"][mode] = results
+        _print(mode, results)
+
+    wb = app.extensions.get("write_behind")
+    if wb is not None:
+        wb.flush(10)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+        print(f"\nResults written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
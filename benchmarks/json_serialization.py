@@ -0,0 +1,85 @@
+"""Бенчмарк сериализации JSON-ответов: стандартный провайдер Flask и orjson.
+
+Строит те же данные, что отдают /api/products и /api/news (страницы по
+``--limit`` объектов со всеми языками), и замеряет только превращение готового
+словаря в Response: ответов в секунду, микросекунд на ответ и размер тела.
+Перед замером проверяется, что оба провайдера выдают один и тот же JSON.
+
+Запуск из корня проекта:
+    python -m benchmarks.json_serialization --limit 100 --iterations 500
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from flask.json.provider import DefaultJSONProvider
+
+from .compression import seed
+
+
+def payloads(app, models, limit):
+    from app.routes.api import _absolute_url
+
+    with app.test_request_context("/api/products"):
+        products = models.Product.query.order_by(models.Product.id).limit(limit).all()
+        news = models.News.query.order_by(models.News.id).limit(limit).all()
+        meta = {"total": 10_000, "current_page": 1, "last_page": 100}
+        return {
+            f"products x{limit}": {"success": True, "message": "Products retrieved successfully", "data": {
+                "products": [p.to_dict(absolute_url_func=None) for p in products], "meta": meta,
+            }},
+            f"news x{limit}": {"success": True, "message": "News retrieved successfully", "data": {
+                "news": [n.to_dict(absolute_url_func=_absolute_url) for n in news], "meta": meta,
+            }},
+        }
+
+
+def measure(app, provider, payload, iterations):
+    with app.test_request_context("/"):
+        body = provider.response(payload).get_data()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            provider.response(payload).get_data()
+        elapsed = time.perf_counter() - started
+    return iterations / elapsed, elapsed / iterations * 1_000_000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=100, help="Объектов на странице.")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-json-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    from app import create_app, models
+    from app.jsonprovider import OrjsonProvider, orjson
+
+    app = create_app()
+    app.debug = False  # компактный JSON, как в продакшене
+    with app.app_context():
+        seed(models.db, models, args.limit, args.limit)
+        data = payloads(app, models, args.limit)
+
+    providers = {"stdlib json": DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers["orjson"] = OrjsonProvider(app)
+    else:
+        print("orjson is not installed, only the standard provider is measured")
+
+    print(f"{'payload':<16} {'provider':<12} {'responses/s':>12} {'us/response':>12} {'bytes':>10} {'speedup':>8}")
+    for name, payload in data.items():
+        with app.test_request_context("/"):
+            decoded = [json.loads(p.response(payload).get_data()) for p in providers.values()]
+        assert all(d == decoded[0] for d in decoded), f"providers disagree on {name}"
+        baseline = None
+        for provider_name, provider in providers.items():
+            rate, micros, size = measure(app, provider, payload, args.iterations)
+            baseline = baseline or rate
+            print(f"{name:<16} {provider_name:<12} {rate:>12.1f} {micros:>12.1f} {size:>10} {rate / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Бенчмарк конкурентных чтений SQLite во время записи.
+
+Несколько процессов читают списки товаров и новостей, пока другие процессы
+отправляют POST в /api/contact_messages и /api/newsletter_subscribers.
+Сравниваются настройки движка по умолчанию и профиль ProductionConfig
+(WAL, synchronous=NORMAL, кэш страниц, mmap, busy_timeout, пул соединений).
+Кэш ответов и отложенная запись отключены, чтобы каждый запрос шел в базу.
+
+Запуск из корня проекта:
+    python -m benchmarks.sqlite_concurrency --readers 4 --writers 2 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from .compression import seed
+
+READ_PATHS = ("/api/products?limit=50&page={page}", "/api/news?limit=20&page={page}")
+
+
+def _make_app(db_url, profile, write_behind):
+    os.environ["DATABASE_URL"] = db_url
+    from app import create_app
+    from app.config import ProductionConfig
+
+    class BenchConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = db_url
+        RESPONSE_CACHE_ENABLED = False
+        WRITE_BEHIND_ENABLED = write_behind
+        if profile == "default":
+            SQLITE_PRAGMAS = {}
+            SQLALCHEMY_ENGINE_OPTIONS = {}
+
+    return create_app(BenchConfig)
+
+
+def _worker(role, index, db_url, profile, write_behind, seconds, results):
+    app = _make_app(db_url, profile, write_behind)
+    client = app.test_client()
+    rng = random.Random(index)
+    ok = errors = 0
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        if role == "reader":
+            path = rng.choice(READ_PATHS).format(page=rng.randint(1, 20))
+            response = client.get(path)
+        elif rng.random() < 0.5:
+            response = client.post("/api/contact_messages", json={
+                "name": "Bench", "email": f"bench{index}@example.com", "message": "x" * 200,
+            })
+        else:
+            response = client.post("/api/newsletter_subscribers", json={
+                "email": f"w{index}-{rng.randrange(10 ** 9)}@example.com",
+            })
+        latencies.append(time.perf_counter() - started)
+        if response.status_code < 400:
+            ok += 1
+        else:
+            errors += 1
+    if write_behind and role == "writer":
+        app.extensions["write_behind"].flush(10)
+    results.put((role, ok, errors, latencies))
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000 if values else 0.0
+
+
+def run(profile, args):
+    workdir = tempfile.mkdtemp(prefix=f"bench-sqlite-{profile}-")
+    db_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    app = _make_app(db_url, profile, args.write_behind)
+    from app import models
+    with app.app_context():
+        seed(models.db, models, args.products, args.news)
+        models.db.engine.dispose()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    roles = ["reader"] * args.readers + ["writer"] * args.writers
+    processes = [
+        ctx.Process(target=_worker, args=(role, i, db_url, profile, args.write_behind, args.seconds, results))
+        for i, role in enumerate(roles)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    for role in ("reader", "writer"):
+        rows = [r for r in collected if r[0] == role]
+        ok = sum(r[1] for r in rows)
+        errors = sum(r[2] for r in rows)
+        latencies = [value for r in rows for value in r[3]]
+        print(
+            f"{profile:<10} {role + 's':<8} {ok / args.seconds:>10.1f} {errors:>8} "
+            f"{_percentile(latencies, 0.5):>9.1f} {_percentile(latencies, 0.99):>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--news", type=int, default=500)
+    parser.add_argument("--write-behind", action="store_true", help="Писать через очередь (app/writebehind.py).")
+    parser.add_argument("--profile", choices=("default", "production", "both"), default="both")
+    args = parser.parse_args()
+
+    print(f"{'profile':<10} {'role':<8} {'req/s':>10} {'errors':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for profile in ("default", "production") if args.profile == "both" else (args.profile,):
+        run(profile, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""create product_fts full-text index
+
+Revision ID: 5d2c7e91a4b3
+Revises: b69f280c382f
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2c7e91a4b3'
+down_revision = 'b69f280c382f'
+branch_labels = None
+depends_on = None
+
+
+# Снимок настроек app/search.py на момент миграции. Приложение при запуске
+# только проверяет наличие таблицы; пересобрать индекс — `flask search-reindex`.
+FTS_TABLE = "product_fts"
+FTS_COLUMNS = (
+    "name_en", "name_ru", "name_tk",
+    "description_en", "description_ru", "description_tk",
+)
+FTS_WEIGHTS = "10.0, 10.0, 10.0, 1.0, 1.0, 1.0"
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite" or sa.inspect(bind).has_table(FTS_TABLE):
+        return
+    columns = ", ".join(FTS_COLUMNS)
+    try:
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"{columns}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    except sa.exc.OperationalError as exc:
+        if "no such module" not in str(exc):
+            raise
+        print("SQLite FTS5 is unavailable, product search will use ILIKE")
+        return
+    op.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25({FTS_WEIGHTS})')")
+    op.execute(f"INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {columns} FROM product")
+    op.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
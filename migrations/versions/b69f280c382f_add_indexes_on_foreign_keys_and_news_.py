@@ -0,0 +1,39 @@
+"""add indexes on foreign keys and news ordering
+
+Revision ID: b69f280c382f
+Revises: 
+Create Date: 2026-10-17 23:10:50.956309
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b69f280c382f'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# Таблицы создаются db.create_all() при запуске приложения вместе с этими
+# индексами, поэтому для новых баз миграция ничего не делает (if_not_exists),
+# а в существующих добавляет недостающие индексы.
+INDEXES = (
+    ("ix_product_category_id", "product", ["category_id"]),
+    ("ix_product_brand_id", "product", ["brand_id"]),
+    ("ix_brand_company_id", "brand", ["company_id"]),
+    ("ix_news_company_id", "news", ["company_id"]),
+    ("ix_news_publication_date_id", "news", ["publication_date", "id"]),
+    ("ix_product_category_parent_category_id", "product_category", ["parent_category_id"]),
+)
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,49 @@
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+# app.config читает DATABASE_URL при импорте: тесты не должны трогать instance/database.db
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='tests-'), 'import.db')}"
+
+from app import create_app  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import db, Company  # noqa: E402
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Приложение на временной SQLite-базе; аргументы переопределяют конфиг."""
+    def make(**overrides):
+        config = type("TestConfig", (Config,), {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primary.db'}",
+            "IMAGE_VARIANTS_ENABLED": False,
+            "WRITE_BEHIND_ENABLED": False,
+            "METRICS_ENABLED": False,
+            "SLOW_QUERY_THRESHOLD_MS": None,
+            **overrides,
+        })
+        return create_app(config)
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def company(app):
+    with app.app_context():
+        item = Company(name_en="Acme", name_ru="Акме", name_tk="Akme")
+        db.session.add(item)
+        db.session.commit()
+        return item.id
+
+
+def copy_database(source, target):
+    """Копирует SQLite-базу целиком (так тесты изображают догнавшую реплику)."""
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
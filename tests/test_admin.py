@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app.admin import NewsAdmin, ProductAdmin, SecureModelView
+from app.models import db, Brand, Company, News, Product, ProductCategory
+
+ROWS = 12
+
+
+@pytest.fixture
+def admin_client(make_app, monkeypatch):
+    monkeypatch.setattr(SecureModelView, "is_accessible", lambda self: True)
+    app = make_app(DEBUG=True)
+    with app.app_context():
+        for i in range(ROWS):
+            # У каждой строки свои связи, иначе identity map скроет N+1
+            company = Company(name_en=f"co{i}", name_ru=f"co{i}", name_tk=f"co{i}")
+            category = ProductCategory(name_en=f"c{i}", name_ru=f"c{i}", name_tk=f"c{i}", slug=f"c{i}")
+            db.session.add_all([company, category])
+            db.session.flush()
+            brand = Brand(name_en=f"b{i}", name_ru=f"b{i}", name_tk=f"b{i}", slug=f"b{i}", company_id=company.id)
+            db.session.add(brand)
+            db.session.flush()
+            db.session.add(Product(
+                name_en=f"p{i}", name_ru=f"p{i}", name_tk=f"p{i}", slug=f"p{i}",
+                brand_id=brand.id, category_id=category.id,
+            ))
+            db.session.add(News(
+                title_en=f"n{i}", title_ru=f"n{i}", title_tk=f"n{i}", slug=f"n{i}",
+                publication_date=date(2025, 1, i + 1), company_id=company.id,
+            ))
+        db.session.commit()
+    return app, app.test_client()
+
+
+def _count_queries(app, client, url):
+    count = 0
+
+    def before_cursor_execute(*args):
+        nonlocal count
+        count += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return count
+
+
+@pytest.mark.parametrize("view, endpoint", [(ProductAdmin, "product"), (NewsAdmin, "news")])
+def test_list_queries_do_not_grow_with_page_size(admin_client, monkeypatch, view, endpoint):
+    app, client = admin_client
+    counts = []
+    for page_size in (2, ROWS):
+        monkeypatch.setattr(view, "page_size", page_size)
+        counts.append(_count_queries(app, client, f"/admin/{endpoint}/"))
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.parametrize("view, endpoint", [(ProductAdmin, "product"), (NewsAdmin, "news")])
+def test_guard_fires_without_eager_loads(admin_client, monkeypatch, view, endpoint):
+    app, client = admin_client
+    monkeypatch.setattr(view, "column_eager_loads", ())
+    monkeypatch.setattr(view, "page_size", 1)
+    with pytest.raises(AssertionError, match="while rendering rows"):
+        client.get(f"/admin/{endpoint}/")
@@ -0,0 +1,45 @@
+from app.models import db, Brand
+
+from .conftest import copy_database
+
+
+def _add_brand(app, company, slug):
+    with app.app_context():
+        db.session.add(Brand(name_en=slug, name_ru=slug, name_tk=slug, slug=slug, company_id=company))
+        db.session.commit()
+
+
+def _slugs(response):
+    return [item["slug"] for item in response.get_json()["data"]]
+
+
+def test_lagging_replica_does_not_poison_cache(make_app, tmp_path, company):
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+    app = make_app(SQLALCHEMY_READ_DATABASE_URI=f"sqlite:///{replica}", TABLE_VERSIONS_REFRESH_INTERVAL=0)
+    _add_brand(app, company, "old")
+    copy_database(primary, replica)
+    client = app.test_client()
+    before = client.get("/api/brands")
+    assert _slugs(before) == ["old"]
+
+    # Запись дошла до основной базы, но не до реплики
+    _add_brand(app, company, "new")
+    lagging = client.get("/api/brands")
+    assert _slugs(lagging) == ["old"]
+    assert lagging.headers["ETag"] == before.headers["ETag"]
+    assert client.get("/api/brands", headers={"If-None-Match": before.headers["ETag"]}).status_code == 304
+
+    # Реплика догнала: новые версии — новый ключ кэша и новый ETag
+    copy_database(primary, replica)
+    fresh = client.get("/api/brands")
+    assert _slugs(fresh) == ["old", "new"]
+    assert fresh.headers["ETag"] != before.headers["ETag"]
+
+
+def test_versions_follow_primary_without_replica(app, company):
+    client = app.test_client()
+    before = client.get("/api/brands")
+    _add_brand(app, company, "new")
+    after = client.get("/api/brands")
+    assert _slugs(after) == ["new"]
+    assert after.headers["ETag"] != before.headers["ETag"]
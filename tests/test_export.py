@@ -0,0 +1,21 @@
+import json
+
+from app.models import db, Brand, Product, ProductCategory
+
+
+def test_product_export_matches_list_urls(app, company):
+    with app.app_context():
+        brand = Brand(name_en="b", name_ru="b", name_tk="b", slug="b", company_id=company)
+        category = ProductCategory(name_en="c", name_ru="c", name_tk="c", slug="c")
+        db.session.add_all([brand, category])
+        db.session.flush()
+        db.session.add(Product(
+            name_en="p", name_ru="p", name_tk="p", slug="p", brand_id=brand.id, category_id=category.id,
+            image="static/uploads/products/p.png",
+        ))
+        db.session.commit()
+    client = app.test_client()
+    listed = client.get("/api/products").get_json()["data"]["products"]
+    exported = [json.loads(line) for line in client.get("/api/products/export").get_data(as_text=True).splitlines()]
+    assert exported == listed
+    assert exported[0]["image"] == "static/uploads/products/p.png"
@@ -0,0 +1,54 @@
+from sqlalchemy import inspect
+
+from app.models import db, Brand, Product, ProductCategory
+from app.search import FTS_TABLE, create_index
+
+
+def _has_index(app):
+    with app.app_context():
+        return inspect(db.engine).has_table(FTS_TABLE)
+
+
+def _add_product(app, company, name):
+    with app.app_context():
+        brand = Brand(name_en="b", name_ru="b", name_tk="b", slug=f"b-{name}", company_id=company)
+        category = ProductCategory(name_en="c", name_ru="c", name_tk="c", slug=f"c-{name}")
+        db.session.add_all([brand, category])
+        db.session.flush()
+        db.session.add(Product(
+            name_en=name, name_ru=name, name_tk=name, slug=name, brand_id=brand.id, category_id=category.id,
+        ))
+        db.session.commit()
+
+
+def _search(app, q):
+    response = app.test_client().get("/api/products", query_string={"q": q})
+    return [item["slug"] for item in response.get_json()["data"]["products"]]
+
+
+def test_startup_does_not_create_index(app, company):
+    assert not _has_index(app)
+    assert app.extensions["product_search"] is False
+    _add_product(app, company, "milk")
+    assert _search(app, "mil") == ["milk"]  # ILIKE
+
+
+def test_search_reindex_creates_index(make_app, company):
+    app = make_app()
+    _add_product(app, company, "milk")
+    result = app.test_cli_runner().invoke(args=["search-reindex"])
+    assert result.exit_code == 0, result.output
+    assert "Indexed 1 products" in result.output
+    assert _search(app, "mil") == ["milk"]
+
+    # Новый воркер находит готовый индекс и синхронизирует его с товарами
+    worker = make_app()
+    assert worker.extensions["product_search"] is True
+    _add_product(worker, company, "cheese")
+    assert _search(worker, "chee") == ["cheese"]
+
+
+def test_create_index_runs_once(app):
+    with app.app_context():
+        assert create_index() is True
+        assert create_index() is False
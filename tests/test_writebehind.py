@@ -0,0 +1,19 @@
+from app.models import db, ContactMessage
+
+
+def test_queued_post_is_fire_and_forget(make_app):
+    app = make_app(WRITE_BEHIND_ENABLED=True, METRICS_ENABLED=True)
+    client = app.test_client()
+    response = client.post("/api/contact_messages", json={"email": "a@example.com", "message": "hi"})
+    assert response.status_code == 202
+    assert "data" not in response.get_json()
+
+    queue = app.extensions["write_behind"]
+    assert queue.flush(timeout=5)
+    with app.app_context():
+        assert db.session.query(ContactMessage.email).all() == [("a@example.com",)]
+
+    metrics = client.get("/metrics").get_data(as_text=True).splitlines()
+    assert "write_behind_written_total 1" in metrics
+    assert "write_behind_lost_total 0" in metrics
+    queue.stop()